@@ -3,12 +3,12 @@
 
 # Import libraries
 from utils.logger import get_logger
-from utils.app_name_const import APP_NAME
+from utils.cache import ttl_cache
 from utils.database import database_execute
 
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+# Get module logger
+logger_app = get_logger(__name__)
 
 
 # Constants
@@ -27,7 +27,7 @@ def save_ad_network(data, many=False):
     @many: is a boolean which indicates if data is a list of lists or a list
     @return: True if the data was saved successfully, False otherwise
     """
-    return database_execute(
+    result = database_execute(
         data=data,
         query="INSERT INTO {} (ad_network_name, ad_network_url, ad_network_date_format) \
                 VALUES (%s, %s, %s)".format(
@@ -38,10 +38,17 @@ def save_ad_network(data, many=False):
         many=many,
     )
 
+    # Cached Ad Networks are not valid anymore
+    read_ad_network.cache.invalidate()
+
+    return result
+
 
+@ttl_cache()
 def read_ad_network(ad_network_name):
     """
-    Reads the Ad Network URL and date format from database.
+    Reads the Ad Network URL and date format from database. Results are cached
+    for METADATA_CACHE_TTL seconds and invalidated when Ad Networks are saved.
 
     @network_name: is the name of the network to be retrieved
     @return: a tuple of the id, URL and date format
@@ -2,144 +2,206 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
-import daily_report
-import pandas as pd
+import time
+from utils.lazy_import import lazy_import
 from utils.logger import get_logger
+from utils.date import parse_date
+from utils.schema import compact_counter
 from utils.app_const import DEFAULT_APP
-from utils.app_name_const import APP_NAME
 from utils.platform_const import DEFAULT_PLATFORM
+from dimension import read_app, read_platform
 
+# Import heavy libraries lazily
+pd = lazy_import("pandas")
 
-# Get analyze logger
-logger_analyze = get_logger(APP_NAME)
+
+# Get module logger
+logger_analyze = get_logger(__name__)
 
 
 # Constants
 DEFAULT_DATE_FORMAT = "%d/%m/%Y"
 DEFAULT_COLUMNS = ["Date", "App", "Platform", "Requests", "Impressions", "Revenue"]
+ANALYZE_REJECT = "reject"  # rows are removed and the data is invalid
+ANALYZE_INVALID = "invalid"  # the data is invalid, but rows are kept
+ANALYZE_WARN = "warn"  # the problem is only logged
 
+# Registered sanity checks (name, action, message, function)
+ANALYZE_RULES = []
 
-def analyze_date(data):
-    """
-    Analyzes the date in data and returns the result.
 
-    @data: is a data frame with a list of dates to be analyzed
-    @return: True if the data is valid, False otherwise
+def analyze_rule(name, action=ANALYZE_REJECT, message=None):
+    """
+    Decorator which registers a sanity check of the analysis. A check is a
+    function which takes the data frame and the shared parsed columns and
+    returns a boolean mask of the rows which don't pass the check.
+
+    @name: is the name of the check
+    @action: is ANALYZE_REJECT (rows are removed and data is invalid),
+    ANALYZE_INVALID (data is invalid) or ANALYZE_WARN (only logged)
+    @message: is the warning which is logged if any row doesn't pass the check
+    (an empty message means that the check logs its own warnings)
+    @return: a decorator
     """
-    # Check if all dates are the same
-    if not (data["Date"] == data["Date"][0]).all():
-        logger_analyze.warning("Dates are not the same")
-        return False
 
-    try:
-        # Check if all dates are in the correct format (DD/MM/YYYY)
-        pd.to_datetime(data["Date"], format=DEFAULT_DATE_FORMAT)
-    except ValueError:
-        logger_analyze.warning("Dates are not in the correct format")
-        return False
+    def decorator(function):
+        ANALYZE_RULES.append((name, action, message, function))
+        return function
 
-    return True
+    return decorator
 
 
-def analyze_requests_impressions(data):
+def parse_columns(data):
     """
-    Analyzes the requests and impressions in data and returns the result.
+    Parses the columns of data which are shared by the sanity checks, so each
+    column is parsed only once.
 
     @data: is a data frame with the data to be analyzed
-    @return: True if the data is valid, False otherwise and the corrected data
+    @return: a dictionary of parsed columns
     """
-    flag_data = True
-
-    # Check if requests are numeric
-    requests = pd.to_numeric(data["Requests"], errors="coerce").isna()
-
-    if len(requests):
-        logger_analyze.warning("Requests are not numeric")
-        flag_data &= False
+    revenue = data[data.keys()[-1]]
+    return {
+        "requests": pd.to_numeric(data["Requests"], errors="coerce"),
+        "impressions": pd.to_numeric(data["Impressions"], errors="coerce"),
+        # Revenue is numeric if it was parsed without currency symbols
+        "revenue": revenue if revenue.dtype.kind == "f" else revenue.astype(str),
+    }
+
+
+@analyze_rule("date_same", ANALYZE_INVALID, "Dates are not the same")
+def rule_date_same(data, columns):
+    return data["Date"] != data["Date"].iloc[0]
+
+
+@analyze_rule("date_format", ANALYZE_INVALID, "Dates are not in the correct format")
+def rule_date_format(data, columns):
+    # Parse each distinct date only once
+    dates = {
+        date: parse_date(date, DEFAULT_DATE_FORMAT, fallback=False) is None
+        for date in data["Date"].unique()
+    }
+    return data["Date"].map(dates).astype(bool)
+
+
+@analyze_rule("requests_numeric", ANALYZE_REJECT, "Requests are not numeric")
+def rule_requests_numeric(data, columns):
+    return columns["requests"].isna()
+
+
+@analyze_rule("impressions_numeric", ANALYZE_REJECT, "Impressions are not numeric")
+def rule_impressions_numeric(data, columns):
+    return columns["impressions"].isna()
+
+
+@analyze_rule("impressions_requests", ANALYZE_REJECT, "")
+def rule_impressions_requests(data, columns):
+    mask = columns["impressions"] > columns["requests"]
+
+    # Analyze which apps on which platforms have this problem (a single warning,
+    # the values are arguments, so the warnings are rate limited together)
+    if mask.any():
+        data_problem = data.loc[mask, ["App", "Platform"]].drop_duplicates()
+        logger_analyze.warning(
+            "Impressions are greater than requests in %s rows of: %s",
+            int(mask.sum()),
+            ", ".join(
+                "{} ({})".format(app, platform)
+                for app, platform in data_problem.values.tolist()
+            ),
+        )
 
-    # Remove requests with NaN
-    data = data[~requests].reset_index(drop=True)
+    return mask
 
-    # Check if impressions are numeric
-    impressions = pd.to_numeric(data["Impressions"], errors="coerce").isna()
 
-    if len(impressions):
-        logger_analyze.warning("Impressions are not numeric")
-        flag_data &= False
+@analyze_rule(
+    "app_platform", ANALYZE_REJECT, "Data contains invalid apps and platforms"
+)
+def rule_app_platform(data, columns, apps=None, platforms=None):
+    """
+    Checks the apps and platforms of the whole columns at once with hash based
+    membership.
 
-    # Remove impressions with NaN
-    data = data[~impressions].reset_index(drop=True)
+    @data: is a data frame with the data to be analyzed
+    @columns: is a dictionary of parsed columns (not used)
+    @apps: is a collection of valid apps (read from the database by default)
+    @platforms: is a collection of valid platforms (read from the database by default)
+    @return: the mask of the rows with an invalid app or platform
+    """
+    # The default apps and platforms are used if the tables can't be read
+    if apps is None:
+        apps = read_app() or DEFAULT_APP
+    if platforms is None:
+        platforms = read_platform() or DEFAULT_PLATFORM
 
-    # Update values of requests and impressions
-    data["Requests"] = data["Requests"].astype(int)
-    data["Impressions"] = data["Impressions"].astype(int)
+    return ~(data["App"].isin(apps) & data["Platform"].isin(platforms))
 
-    # Check if impressions are greater than requests
-    if (data["Impressions"] > data["Requests"]).any():
-        logger_analyze.warning("Impressions are greater than requests:")
 
-        # Analyze which apps on which platforms have this problem
-        data_problem = (
-            data[data["Impressions"] > data["Requests"]][["App", "Platform"]]
-            .drop_duplicates()
-            .values.tolist()
-        )
-        for app, platform in data_problem:
-            logger_analyze.warning(
-                "Problem occurs in application {} ({})".format(app, platform)
-            )
+@analyze_rule("revenue_negative", ANALYZE_INVALID, "Revenue is negative")
+def rule_revenue_negative(data, columns):
+    if columns["revenue"].dtype.kind == "f":
+        return columns["revenue"] < 0
 
-        # Remove all rows with impressions greater than requests (keep impressions is equal to requests)
-        data = data[~(data["Impressions"] > data["Requests"])].reset_index(drop=True)
+    return columns["revenue"].str.contains("-", regex=False)
 
-        return False, data
 
-    return True, data
+@analyze_rule("revenue_numeric", ANALYZE_WARN, "Revenue is not numeric")
+def rule_revenue_numeric(data, columns):
+    # Revenue with a currency is handled in utils.revenue
+    return pd.to_numeric(columns["revenue"], errors="coerce").isna()
 
 
-def analyze_app_platform(data):
+def analyze_rules(data, columns):
     """
-    Analyzes the app and platform in data and returns the result.
+    Evaluates all registered sanity checks on data and combines them into a
+    single mask of the rejected rows.
 
     @data: is a data frame with the data to be analyzed
-    @return: True if the data is valid, False otherwise and the corrected data
+    @columns: is a dictionary of parsed columns (see parse_columns)
+    @return: the mask of the rejected rows, True if the data is valid, False
+    otherwise and a report of each check (name, number of failed rows, time)
     """
+    rejected = pd.Series(False, index=data.index)
     flag_data = True
-    drop_data = []
-    # Check if app and platform is valid, if not, remove it
-    for temp_data in data.itertuples():
-        # [Index, Date, App, Platform, Requests, Impressions, Revenue]
-        if not temp_data[2] in DEFAULT_APP:
-            # Check if app is valid
-            drop_data.append(temp_data[0])
-        elif not temp_data[3] in DEFAULT_PLATFORM:
-            # Check if platform is valid
-            drop_data.append(temp_data[0])
-
-    if len(drop_data):
-        logger_analyze.warning("Data contains invalid apps and platforms")
-        # Remove useless data
-        data.drop(drop_data, inplace=True)
-        flag_data = False
-
-    return flag_data, data
+    report = []
+
+    for name, action, message, function in ANALYZE_RULES:
+        start = time.perf_counter()
+        mask = function(data, columns)
+        count = int(mask.sum())
+
+        if count:
+            if message:
+                logger_analyze.warning(message)
+            if action == ANALYZE_REJECT:
+                rejected |= mask
+            if action != ANALYZE_WARN:
+                flag_data = False
+
+        report.append(
+            {
+                "rule": name,
+                "action": action,
+                "failed": count,
+                "time": time.perf_counter() - start,
+            }
+        )
 
+    return rejected, flag_data, report
 
-def analyze(data):
+
+def analyze_report(data):
     """
     Gets the data from URL and analyzes it and returns True if the data is
     valid, False otherwise. Function analyzes the column names, dates, requests
     and impressions, and revenue. Function also corrects the invalid data.
 
     @data: is a data frame with the data to be analyzed
-    @return: corrected data and True if the data is valid, False otherwise
+    @return: corrected data, True if the data is valid, False otherwise and a
+    report of each sanity check
     """
-    global logger_analyze
-    logger_analyze = get_logger("Analyze")
-
     if data is None or not len(data):
         logger_analyze.error("Invalid daily report")
-        return None, False
+        return None, False, []
 
     flag_data = True  # a flag that indicates if the data is valid
 
@@ -161,44 +223,44 @@ def analyze(data):
         # Remove last row
         data.drop(len(data) - 1, inplace=True)
 
-    # Analyze date
-    flag_data &= analyze_date(data)
-
-    # Analyze requests and impressions
-    temp_flag_data, temp_data = analyze_requests_impressions(data)
+    # Run all sanity checks in one pass and remove the rejected rows
+    columns = parse_columns(data)
+    rejected, temp_flag_data, report = analyze_rules(data, columns)
     flag_data &= temp_flag_data
-    # Check if data is valid, than update it
-    if temp_data is not None and len(temp_data):
-        data = temp_data
 
-    # Analyze app and platform
-    temp_flag_data, data = analyze_app_platform(data)
-    flag_data &= temp_flag_data
+    data = data[~rejected].reset_index(drop=True)
+    data["Requests"] = compact_counter(
+        columns["requests"][~rejected].reset_index(drop=True).astype("int64")
+    )
+    data["Impressions"] = compact_counter(
+        columns["impressions"][~rejected].reset_index(drop=True).astype("int64")
+    )
 
-    # Check if revenue is positive
-    if data[data.keys()[-1]].str.contains("-").any():
-        logger_analyze.warning("Revenue is negative")
-        flag_data &= False
+    return data, flag_data, report
 
-    try:
-        # Check if revenue is numeric
-        pd.to_numeric(data[data.keys()[-1]])
-        # Convert revenue to numeric, because we want to analyze it
-        # Don't convert revenue to numeric, because we want to keep it as string
-    except ValueError:
-        logger_analyze.warning("Revenue is not numeric")
-        # flag_data &= False # ignore revenue error, handled in utils.revenue
 
+def analyze(data):
+    """
+    Gets the data from URL and analyzes it and returns True if the data is
+    valid, False otherwise (see analyze_report).
+
+    @data: is a data frame with the data to be analyzed
+    @return: corrected data and True if the data is valid, False otherwise
+    """
+    data, flag_data, _ = analyze_report(data)
     return data, flag_data
 
 
 if __name__ == "__main__":
+    # Imported only here, because daily_report imports analyze
+    from daily_report import daily_report
+
     ad_networks = ["SuperNetwork", "AdUmbrella"]
     dates = ["2017-09-15", "2017-09-16"]
 
     for temp_ad_network in ad_networks:
         for temp_date in dates:
-            data = daily_report.daily_report(
+            data = daily_report(
                 temp_ad_network,
                 temp_date,
                 logger=logger_analyze,
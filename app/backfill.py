@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import csv
+import sys
+import json
+import time
+import argparse
+import datetime
+from collections import deque
+from daily_report import daily_report, is_not_modified
+from utils.logger import get_logger
+from utils.metrics import render_metrics
+from utils.date_format_const import DATE_FORMAT
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+# Get module logger
+logger_app = get_logger(__name__)
+
+
+# Constants
+BACKFILL_WORKERS = 4  # one pooled connection each, at most DATABASE_POOL_MAX
+BACKFILL_NETWORK_WORKERS = 2
+
+
+def date_range(start_date, end_date):
+    """
+    Creates a list of all dates between start and end date (both included).
+
+    @start_date: is the first date (YYYY-MM-DD)
+    @end_date: is the last date (YYYY-MM-DD)
+    @return: a list of dates in the format YYYY-MM-DD
+    """
+    start = datetime.datetime.strptime(start_date, DATE_FORMAT).date()
+    end = datetime.datetime.strptime(end_date, DATE_FORMAT).date()
+
+    return [
+        (start + datetime.timedelta(days=day)).strftime(DATE_FORMAT)
+        for day in range((end - start).days + 1)
+    ]
+
+
+def backfill_job(
+    ad_network, date, update=True, save=True, conditional=True, replay=False
+):
+    """
+    Runs the daily report for one Ad Network and date and measures it.
+
+    @ad_network: is the name of the ad network
+    @date: is the date of the report
+    @update: is a boolean which indicates if the currency data should be updated
+    @save: is a boolean which indicates if the data should be saved into the database
+    @conditional: is a boolean which indicates if unchanged reports are skipped
+    @replay: is a boolean which indicates if reports are read from the report cache
+    @return: a dictionary with the result of the job
+    """
+    start = time.perf_counter()
+    try:
+        data = daily_report(
+            ad_network,
+            date,
+            update=update,
+            save=save,
+            conditional=conditional,
+            replay=replay,
+        )
+        error = None
+    except Exception as exception:
+        data = None
+        error = str(exception)
+
+    return {
+        "ad_network": ad_network,
+        "date": date,
+        "success": data is not None and (len(data) > 0 or is_not_modified(data)),
+        "skipped": is_not_modified(data),
+        "rows": 0 if data is None else len(data),
+        "time": round(time.perf_counter() - start, 3),
+        "error": error,
+    }
+
+
+def read_jobs(lines):
+    """
+    Reads jobs from lines of CSV (AD_NETWORK,DATE) or JSON
+    ({"ad_network": AD_NETWORK, "date": DATE}). Empty lines, comments (#) and
+    the CSV header are skipped.
+
+    @lines: is an iterable of lines (e.g. a file or sys.stdin)
+    @return: a list of (ad_network, date) tuples
+    """
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        try:
+            if line.startswith("{"):
+                job = json.loads(line)
+                job = (job["ad_network"], job["date"])
+            else:
+                job = tuple(value.strip() for value in next(csv.reader([line])))
+                if job == ("ad_network", "date"):
+                    continue
+            ad_network, date = job
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Job on line {} is not valid: {}".format(number, line))
+
+        jobs.append((str(ad_network), str(date)))
+
+    return jobs
+
+
+def run_jobs(
+    jobs,
+    workers=BACKFILL_WORKERS,
+    network_workers=BACKFILL_NETWORK_WORKERS,
+    update=True,
+    save=True,
+    conditional=True,
+    replay=False,
+    logger=None,
+    name="Backfill",
+):
+    """
+    Runs the daily report of every job on a bounded thread pool. At most
+    network_workers reports of the same Ad Network run at the same time, so a
+    single Ad Network is never flooded. All jobs share the database connection
+    pool and the caches of the process.
+
+    @jobs: is a list of (ad_network, date) tuples
+    @workers: is the maximum number of reports processed at the same time
+    @network_workers: is the maximum number of reports per Ad Network at the same time
+    @update: is a boolean which indicates if the currency data should be updated
+    @save: is a boolean which indicates if the data should be saved into the database
+    @conditional: is a boolean which indicates if unchanged reports are skipped
+    @replay: is a boolean which indicates if reports are read from the report cache
+    @logger: is the logger object
+    @name: is the name of the run in the progress messages
+    @return: a dictionary with the summary and the results of all jobs
+    """
+    logger = logger or logger_app
+    start = time.perf_counter()
+
+    # Queue of pending dates for each Ad Network (in the order of the jobs)
+    pending = {}
+    for ad_network, date in jobs:
+        pending.setdefault(ad_network, deque()).append(date)
+    ad_networks = list(pending)
+    running = {ad_network: 0 for ad_network in ad_networks}
+    total = len(jobs)
+
+    results = []
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+
+        def schedule():
+            # Fill free workers round robin, respecting the Ad Network limits
+            scheduled = True
+            while scheduled and len(futures) < max(1, workers):
+                scheduled = False
+                for ad_network in ad_networks:
+                    if len(futures) >= max(1, workers):
+                        break
+                    if pending[ad_network] and running[ad_network] < max(
+                        1, network_workers
+                    ):
+                        date = pending[ad_network].popleft()
+                        future = executor.submit(
+                            backfill_job,
+                            ad_network,
+                            date,
+                            update,
+                            save,
+                            conditional,
+                            replay,
+                        )
+                        futures[future] = ad_network
+                        running[ad_network] += 1
+                        scheduled = True
+
+        schedule()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                running[futures.pop(future)] -= 1
+                result = future.result()
+                results.append(result)
+                logger.info(
+                    "{} {}/{}: {} ({}) {} in {}s".format(
+                        name,
+                        len(results),
+                        total,
+                        result["ad_network"],
+                        result["date"],
+                        "skipped"
+                        if result["skipped"]
+                        else "succeeded"
+                        if result["success"]
+                        else "failed",
+                        result["time"],
+                    )
+                )
+            schedule()
+
+    failed = [result for result in results if not result["success"]]
+    summary = {
+        "total": total,
+        "succeeded": total - len(failed),
+        "skipped": len([result for result in results if result["skipped"]]),
+        "failed": len(failed),
+        "time": round(time.perf_counter() - start, 3),
+        "failures": [(result["ad_network"], result["date"]) for result in failed],
+        "results": sorted(results, key=lambda x: (x["ad_network"], x["date"])),
+    }
+    logger.info(
+        "{} finished: {} succeeded ({} skipped), {} failed in {}s".format(
+            name,
+            summary["succeeded"],
+            summary["skipped"],
+            summary["failed"],
+            summary["time"],
+        )
+    )
+
+    return summary
+
+
+def backfill(
+    ad_networks,
+    start_date,
+    end_date,
+    workers=BACKFILL_WORKERS,
+    network_workers=BACKFILL_NETWORK_WORKERS,
+    update=True,
+    save=True,
+    conditional=True,
+    replay=False,
+    logger=None,
+):
+    """
+    Runs the daily report for every Ad Network and every date in the range (see
+    run_jobs).
+
+    @ad_networks: is a list of Ad Network names
+    @start_date: is the first date (YYYY-MM-DD)
+    @end_date: is the last date (YYYY-MM-DD)
+    @workers: is the maximum number of reports processed at the same time
+    @network_workers: is the maximum number of reports per Ad Network at the same time
+    @update: is a boolean which indicates if the currency data should be updated
+    @save: is a boolean which indicates if the data should be saved into the database
+    @conditional: is a boolean which indicates if unchanged reports are skipped
+    @replay: is a boolean which indicates if reports are read from the report cache
+    @logger: is the logger object
+    @return: a dictionary with the summary and the results of all jobs
+    """
+    dates = date_range(start_date, end_date)
+
+    return run_jobs(
+        [(ad_network, date) for ad_network in ad_networks for date in dates],
+        workers=workers,
+        network_workers=network_workers,
+        update=update,
+        save=save,
+        conditional=conditional,
+        replay=replay,
+        logger=logger,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backfills daily reports for a date range of Ad Networks."
+    )
+    parser.add_argument("start_date", help="first date (YYYY-MM-DD)")
+    parser.add_argument("end_date", help="last date (YYYY-MM-DD)")
+    parser.add_argument("ad_networks", nargs="+", help="names of the Ad Networks")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--network-workers", type=int, default=BACKFILL_NETWORK_WORKERS)
+    parser.add_argument(
+        "--no-update", action="store_true", help="don't update currency rates"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="reimport unchanged reports"
+    )
+    parser.add_argument(
+        "--replay", action="store_true", help="reprocess reports from the cache"
+    )
+    parser.add_argument("--metrics", help="file for the metrics (Prometheus text)")
+    arguments = parser.parse_args()
+
+    try:
+        summary = backfill(
+            arguments.ad_networks,
+            arguments.start_date,
+            arguments.end_date,
+            workers=arguments.workers,
+            network_workers=arguments.network_workers,
+            update=not arguments.no_update,
+            conditional=not arguments.force,
+            replay=arguments.replay,
+        )
+    except ValueError:
+        logger_app.error("Dates are not valid (YYYY-MM-DD)")
+        sys.exit(1)
+
+    for temp_ad_network, temp_date in summary["failures"]:
+        logger_app.warning("Failed: %s (%s)", temp_ad_network, temp_date)
+
+    if arguments.metrics:
+        with open(arguments.metrics, "w") as temp_file:
+            temp_file.write(render_metrics())
+
+    sys.exit(1 if summary["failed"] else 0)
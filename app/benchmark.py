@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import platform
+import threading
+import contextlib
+import subprocess
+import http.server
+from unittest import mock
+from utils.logger import get_logger
+from utils.app_const import DEFAULT_APP
+from utils.currency import read_currency
+from analyze import analyze, rule_app_platform, DEFAULT_DATE_FORMAT
+from utils.platform_const import DEFAULT_PLATFORM
+from utils.database import database_execute, database_transaction
+from utils.schema import concat_chunks, memory_per_row
+from daily_report import (
+    copy_daily_report,
+    save_daily_report,
+    read_daily_report,
+    parse_daily_report,
+    fix_daily_report,
+    cluster_daily_report,
+    create_daily_report_partitions,
+)
+from utils.lazy_import import lazy_import
+
+# Import heavy libraries lazily
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# Get benchmark logger
+logger_benchmark = get_logger("Benchmark")
+
+
+# Constants
+BENCHMARK_SAVE_ROWS = [1000, 10000, 100000]
+BENCHMARK_ANALYZE_ROWS = [1000, 100000, 1000000]
+BENCHMARK_CLUSTER_ROWS = [100000, 1000000]
+BENCHMARK_RANGE_ROWS = [1000000, 10000000]
+BENCHMARK_RANGE_REPEAT = 3  # number of times each range query is run
+BENCHMARK_RANGE_DAYS = 1095  # synthetic reports cover 2015-01-01 - 2017-12-30
+BENCHMARK_IMPORT_RUNS = [5]  # the fastest of the runs is reported
+BENCHMARK_PIPELINE_ROWS = [1000, 100000, 1000000]
+# Dirtiness of the synthetic reports of the pipeline benchmark
+BENCHMARK_PIPELINE_CURRENCY = "EUR"  # currency of the revenue column
+BENCHMARK_PIPELINE_BAD_DATES = 0.01  # share of dates in a non-default format
+BENCHMARK_PIPELINE_INVALID = 0.05  # share of rows with an unknown app or platform
+BENCHMARK_PIPELINE_TOTALS = True  # the report ends with a Totals row
+BENCHMARK_MEMORY_ROWS = [1000000]
+# Budget of the peak memory (RSS) of processing a report of 1M rows (bytes)
+MEMORY_BUDGET_ROWS = 1000000
+MEMORY_BUDGET = 192 * 1024 * 1024
+MEMORY_EXCHANGE_RATE = 1.1  # fixed currency/USD rate, the database isn't used
+PIPELINE_STAGES = [
+    "read_daily_report",
+    "analyze",
+    "fix_daily_report",
+    "cluster_daily_report",
+    "save_daily_report",
+]
+# Command line applications and the budget of their cold import time (seconds)
+IMPORT_TIME_MODULES = ["main", "daily_report", "backfill", "exchange_rates", "server"]
+IMPORT_TIME_BUDGET = 0.15
+BENCHMARK_RANGE_QUERIES = [
+    # One month of one Ad Network
+    (
+        "SELECT SUM(report_revenue) FROM {} WHERE ad_network_id = %s \
+            AND report_date >= %s AND report_date < %s",
+        (7, "2016-03-01", "2016-04-01"),
+    ),
+    # One month of all Ad Networks by app
+    (
+        "SELECT report_app, SUM(report_revenue) FROM {} WHERE report_date >= %s \
+            AND report_date < %s GROUP BY report_app ORDER BY report_app",
+        ("2016-03-01", "2016-04-01"),
+    ),
+    # All days of one app and platform
+    (
+        "SELECT SUM(report_revenue) FROM {} WHERE report_app = %s \
+            AND report_platform = %s",
+        ("App 7", "iOS"),
+    ),
+]
+
+
+def generate_daily_report(rows, seed=7):
+    """
+    Generates a cleaned daily report which is ready to be saved.
+
+    @rows: is the number of rows to be generated
+    @seed: is the seed of the random generator
+    @return: a data frame with the columns of the daily_report table
+    """
+    generator = random.Random(seed)
+    data = []
+    for index in range(rows):
+        requests = generator.randint(1000, 100000)
+        data.append(
+            [
+                "2017-09-{:02d}".format(index % 28 + 1),
+                DEFAULT_APP[index % len(DEFAULT_APP)],
+                DEFAULT_PLATFORM[index % len(DEFAULT_PLATFORM)],
+                requests,
+                generator.randint(0, requests),
+                round(generator.uniform(0, 100), 2),
+                None,
+                None,
+            ]
+        )
+
+    return pd.DataFrame(
+        data,
+        columns=[
+            "Date",
+            "App",
+            "Platform",
+            "Requests",
+            "Impressions",
+            "Revenue",
+            "currency",
+            "ad_network",
+        ],
+    )
+
+
+def generate_app_platform(rows, invalid=0.05, seed=7):
+    """
+    Generates a data frame of apps and platforms where a part of the rows
+    contains unknown apps or platforms.
+
+    @rows: is the number of rows to be generated
+    @invalid: is the share of rows with an unknown app or platform
+    @seed: is the seed of the random generator
+    @return: a data frame with the App and Platform columns
+    """
+    generator = np.random.default_rng(seed)
+    apps = np.array(DEFAULT_APP + ["Unknown App"], dtype=object)
+    platforms = np.array(DEFAULT_PLATFORM + ["Unknown Platform"], dtype=object)
+
+    # Pick a valid value for most rows and the unknown value for the rest
+    app = generator.integers(0, len(DEFAULT_APP), rows)
+    app[generator.random(rows) < invalid / 2] = len(DEFAULT_APP)
+    platform = generator.integers(0, len(DEFAULT_PLATFORM), rows)
+    platform[generator.random(rows) < invalid / 2] = len(DEFAULT_PLATFORM)
+
+    return pd.DataFrame({"App": apps[app], "Platform": platforms[platform]})
+
+
+def analyze_app_platform_rows(data, apps, platforms):
+    """
+    Row by row implementation of rule_app_platform, which is used as the
+    baseline of the benchmark.
+
+    @data: is a data frame with the data to be analyzed
+    @apps: is a list of valid apps
+    @platforms: is a list of valid platforms
+    @return: the corrected data
+    """
+    drop_data = []
+    for temp_data in data.itertuples():
+        if not temp_data.App in apps or not temp_data.Platform in platforms:
+            drop_data.append(temp_data[0])
+
+    return data.drop(drop_data)
+
+
+def benchmark_analyze_app_platform(rows):
+    """
+    Measures the rows per second of the row by row and the columnar app and
+    platform validation.
+
+    @rows: is the number of rows to be analyzed
+    @return: a dictionary with rows per second of each implementation
+    """
+    data = generate_app_platform(rows)
+    result = {}
+
+    start = time.perf_counter()
+    expected = analyze_app_platform_rows(data, DEFAULT_APP, DEFAULT_PLATFORM)
+    result["rows"] = rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    actual = data[~rule_app_platform(data, None, DEFAULT_APP, DEFAULT_PLATFORM)]
+    result["columnar"] = rows / (time.perf_counter() - start)
+
+    # Both implementations must keep the same rows
+    assert expected.index.equals(actual.index)
+
+    return result
+
+
+def generate_cluster_report(rows, dates=1, seed=7):
+    """
+    Generates a fixed daily report which is ready to be clustered.
+
+    @rows: is the number of rows to be generated
+    @dates: is the number of distinct dates
+    @seed: is the seed of the random generator
+    @return: a data frame with the default columns
+    """
+    generator = np.random.default_rng(seed)
+    data = generate_app_platform(rows, invalid=0, seed=seed)
+    requests = generator.integers(1000, 100000, rows)
+
+    data.insert(
+        0,
+        "Date",
+        np.array(
+            ["2017-09-{:02d}".format(day + 1) for day in range(dates)], dtype=object
+        )[generator.integers(0, dates, rows)],
+    )
+    data["Requests"] = requests
+    data["Impressions"] = (requests * generator.random(rows)).astype("int64")
+    data["Revenue"] = generator.uniform(0, 100, rows).round(2)
+
+    return data
+
+
+def cluster_daily_report_rows(data):
+    """
+    Implementation of cluster_daily_report which rebuilds the clustered rows in
+    Python, which is used as the baseline of the benchmark.
+
+    @data: is a data frame of the data
+    @return: a data frame of the data
+    """
+    temp_data = data.groupby(["Date", "App", "Platform"]).sum()
+
+    cluster_data = []
+    for combination in temp_data.itertuples():
+        cluster_data.append([*combination[0], *combination[1:]])
+
+    return pd.DataFrame(cluster_data, columns=data.keys())
+
+
+def benchmark_cluster_daily_report(rows):
+    """
+    Measures the rows per second of the row rebuilding and the columnar
+    clustering of daily reports.
+
+    @rows: is the number of rows to be clustered
+    @return: a dictionary with rows per second of each implementation
+    """
+    data = generate_cluster_report(rows, dates=28)
+    result = {}
+
+    start = time.perf_counter()
+    cluster_daily_report_rows(data)
+    result["rows"] = rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cluster_daily_report(data)
+    result["columnar"] = rows / (time.perf_counter() - start)
+
+    return result
+
+
+def benchmark_save_daily_report(rows):
+    """
+    Measures the rows per second of the COPY and the INSERT save paths. Both
+    paths run inside a transaction which is rolled back, so nothing is stored.
+
+    @rows: is the number of rows to be saved
+    @return: a dictionary with rows per second of each save path
+    """
+    data = generate_daily_report(rows)
+    result = {}
+    assert create_daily_report_partitions(data.iloc[:, 0].unique())
+
+    with database_transaction() as connection:
+        # COPY FROM STDIN
+        start = time.perf_counter()
+        copy_daily_report(data, False)
+        result["copy"] = rows / (time.perf_counter() - start)
+        connection.rollback()
+
+        # INSERT with executemany
+        start = time.perf_counter()
+        save_daily_report(data.to_numpy(), True, False)
+        result["insert"] = rows / (time.perf_counter() - start)
+        connection.rollback()
+
+    return result
+
+
+def generate_report_csv(
+    rows,
+    currency=BENCHMARK_PIPELINE_CURRENCY,
+    bad_dates=BENCHMARK_PIPELINE_BAD_DATES,
+    invalid=BENCHMARK_PIPELINE_INVALID,
+    totals=BENCHMARK_PIPELINE_TOTALS,
+    seed=7,
+):
+    """
+    Generates a raw daily report of an Ad Network as it is downloaded (all
+    values are strings). The dirtiness of the report is configurable.
+
+    @rows: is the number of rows to be generated
+    @currency: is the currency of the revenue (e.g. USD, EUR), which is set in
+    the name of the revenue column -> Revenue (eur)
+    @bad_dates: is the share of rows whose date is in a non-default format
+    (YYYY-MM-DD instead of DD/MM/YYYY), which doesn't match the date format
+    hint of the report rows, so these dates are parsed by the fallback format
+    @invalid: is the share of rows with an unknown app or platform
+    @totals: is a boolean which indicates if the last row contains the totals
+    @seed: is the seed of the random generator
+    @return: the CSV report as bytes
+    """
+    generator = np.random.default_rng(seed)
+    data = generate_app_platform(rows, invalid=invalid, seed=seed)
+    requests = generator.integers(1000, 100000, rows)
+    impressions = (requests * generator.random(rows)).astype("int64")
+    revenue = generator.uniform(0, 100, rows).round(2)
+
+    dates = np.full(rows, "15/09/2017", dtype=object)
+    dates[generator.random(rows) < bad_dates] = "2017-09-15"
+    data.insert(0, "Date", dates)
+    data["Requests"] = requests
+    data["Impressions"] = impressions
+    data["Revenue ({})".format(currency.lower())] = revenue
+
+    if totals:
+        data.loc[len(data)] = [
+            "Totals",
+            "",
+            "",
+            requests.sum(),
+            impressions.sum(),
+            round(revenue.sum(), 2),
+        ]
+
+    return data.to_csv(index=False).encode()
+
+
+@contextlib.contextmanager
+def serve_reports(reports):
+    """
+    Serves reports from a local HTTP server, which stands in for the storage
+    of the Ad Networks. The server runs in a background thread until the
+    context is left.
+
+    @reports: is a dictionary of paths and report bodies -> {"/a.csv": b"..."}
+    @return: a context manager which yields the URL of the server
+    """
+
+    class ReportHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = reports.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ReportHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield "http://{}:{}".format(*server.server_address)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def benchmark_pipeline(
+    rows,
+    currency=BENCHMARK_PIPELINE_CURRENCY,
+    bad_dates=BENCHMARK_PIPELINE_BAD_DATES,
+    invalid=BENCHMARK_PIPELINE_INVALID,
+    totals=BENCHMARK_PIPELINE_TOTALS,
+):
+    """
+    Measures the milliseconds of each stage of the daily report pipeline on a
+    synthetic report (see generate_report_csv), which is downloaded from a
+    local HTTP server. The report is saved the same way as in daily_report
+    (COPY, with the INSERT fallback) inside a transaction which is rolled back,
+    so nothing is stored.
+
+    @rows: is the number of rows of the report
+    @currency: is the currency of the revenue
+    @bad_dates: is the share of rows whose date is in a non-default format
+    @invalid: is the share of rows with an unknown app or platform
+    @totals: is a boolean which indicates if the last row contains the totals
+    @return: a dictionary with milliseconds of each stage and of the whole
+    pipeline
+    """
+    report = generate_report_csv(rows, currency, bad_dates, invalid, totals)
+    result = {}
+
+    def measure(stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        value = function(*args, **kwargs)
+        result[stage] = (time.perf_counter() - start) * 1000
+        return value
+
+    with serve_reports({"/report.csv": report}) as url:
+        data = measure("read_daily_report", read_daily_report, url + "/report.csv")
+    assert data is not None and len(data) == rows + totals
+
+    data, _ = measure("analyze", analyze, data)
+    data, currency = measure(
+        "fix_daily_report", fix_daily_report, data, False, DEFAULT_DATE_FORMAT
+    )
+    data = measure("cluster_daily_report", cluster_daily_report, data)
+    assert data is not None
+
+    currency_id = read_currency(currency)[0] if currency else None
+    data = data.assign(currency=currency_id, ad_network=None)
+    assert create_daily_report_partitions(data["Date"].unique())
+    with database_transaction() as connection:
+        saved = measure(
+            "save_daily_report",
+            lambda: copy_daily_report(data, False)
+            or save_daily_report(data.to_numpy(), True, False),
+        )
+        connection.rollback()
+    assert saved
+
+    result["total"] = sum(result.values())
+
+    return result
+
+
+@contextlib.contextmanager
+def offline_lookups(exchange_rate=MEMORY_EXCHANGE_RATE):
+    """
+    Replaces the database lookups of the pipeline (the exchange rate and the
+    valid apps and platforms) with fixed values, so only the data frames are
+    processed.
+
+    @exchange_rate: is the currency/USD exchange rate of every currency
+    @return: a context manager
+    """
+    with mock.patch(
+        "utils.revenue.get_exchange_rate_usd", return_value=exchange_rate
+    ), mock.patch("analyze.read_app", return_value=DEFAULT_APP), mock.patch(
+        "analyze.read_platform", return_value=DEFAULT_PLATFORM
+    ):
+        yield
+
+
+def process_report_file(path):
+    """
+    Processes a raw report file in memory like daily_report (parse, analyze,
+    fix and cluster) without saving it. The database lookups are replaced with
+    fixed values (see offline_lookups).
+
+    @path: is the path of the CSV report
+    @return: a dictionary with the rows of the report and the bytes per row of
+    the parsed data frame
+    """
+    with open(path, "rb") as file:
+        data = concat_chunks(parse_daily_report(file))
+    result = {"rows": len(data), "bytes_per_row": memory_per_row(data)}
+
+    with offline_lookups():
+        data, _ = analyze(data)
+        data, _ = fix_daily_report(data, False, DEFAULT_DATE_FORMAT)
+        assert cluster_daily_report(data) is not None
+
+    return result
+
+
+def measure_peak_memory(path):
+    """
+    Measures the peak memory (RSS) of processing a report file in a new Python
+    interpreter (see process_report_file). The memory of the interpreter and
+    of the imported libraries is measured before and subtracted.
+
+    @path: is the path of the CSV report
+    @return: a dictionary with the rows of the report, the bytes per row of the
+    parsed data frame and the peak memory of processing the report (bytes)
+    """
+    script = (
+        "import sys, json, resource, pandas, psycopg2, dateutil.parser, benchmark\n"
+        "start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "result = benchmark.process_report_file(sys.argv[1])\n"
+        "end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "result['peak'] = (end - start) * 1024\n"  # ru_maxrss is in KiB
+        "print(json.dumps(result))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def benchmark_memory(rows):
+    """
+    Measures the bytes per row of a parsed synthetic report (see
+    generate_report_csv) and of the peak memory of processing it.
+
+    @rows: is the number of rows of the report
+    @return: a dictionary with bytes per row of the parsed data frame and of
+    the peak memory
+    """
+    with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+        file.write(generate_report_csv(rows))
+        file.flush()
+        result = measure_peak_memory(file.name)
+
+    return {"data_frame": result["bytes_per_row"], "peak": result["peak"] / rows}
+
+
+def generate_range_table(table, rows, partitioned):
+    """
+    Creates a daily report table and fills it with synthetic rows on the
+    database server. Every row has a distinct date, app, platform and Ad
+    Network.
+
+    @table: is the name of the table
+    @rows: is the number of rows to be generated
+    @partitioned: is a boolean which indicates if the table has the monthly
+    partitions and indexes of daily_report or only the primary key
+    @return: True if the table was created, False otherwise
+    """
+    if partitioned:
+        query = "CREATE TABLE {table} (LIKE daily_report, PRIMARY KEY \
+            (report_id, report_date), UNIQUE (report_date, report_app, \
+            report_platform, ad_network_id)) PARTITION BY RANGE (report_date); \
+            CREATE INDEX ON {table} (ad_network_id, report_date); \
+            CREATE INDEX ON {table} (report_app, report_platform)"
+    else:
+        query = "CREATE TABLE {table} (LIKE daily_report, PRIMARY KEY (report_id))"
+
+    result = database_execute(
+        (), query.format(table=table), logger_benchmark, "Table was created"
+    )
+    if result is False:
+        return False
+
+    months = [
+        "{}-{:02d}-01".format(year, month)
+        for year in range(2015, 2018)
+        for month in range(1, 13)
+    ]
+    if partitioned and not create_daily_report_partitions(months, table, True):
+        return False
+
+    result = database_execute(
+        {"rows": rows, "days": BENCHMARK_RANGE_DAYS},
+        "INSERT INTO {table} SELECT i, DATE '2015-01-01' + i %% %(days)s, \
+            'App ' || (i / %(days)s) %% 50, \
+            (ARRAY['iOS', 'Android'])[1 + (i / %(days)s / 50) %% 2], \
+            1000, 100, 1.5, NOW(), NOW(), NULL, i / %(days)s / 100 \
+            FROM generate_series(0, %(rows)s - 1) AS i; ANALYZE {table}".format(
+            table=table
+        ),
+        logger_benchmark,
+        "Rows were generated",
+    )
+
+    return result is not False
+
+
+def benchmark_range_query(rows):
+    """
+    Measures the queries per second of date range, Ad Network, and app and
+    platform queries on an unpartitioned table with only the primary key and
+    on a monthly partitioned table with the indexes of daily_report. Both
+    tables are created inside a transaction which is rolled back, so nothing is
+    stored.
+
+    @rows: is the number of rows in each table
+    @return: a dictionary with queries per second of each table
+    """
+    result = {}
+    expected = None
+
+    with database_transaction() as connection:
+        for table, partitioned in (
+            ("benchmark_heap", False),
+            ("benchmark_partitioned", True),
+        ):
+            assert generate_range_table(table, rows, partitioned)
+
+            answers = []
+            start = time.perf_counter()
+            for _ in range(BENCHMARK_RANGE_REPEAT):
+                for query, data in BENCHMARK_RANGE_QUERIES:
+                    answers.append(
+                        database_execute(
+                            data,
+                            query.format(table),
+                            logger_benchmark,
+                            "Query was executed",
+                            fetch_all=True,
+                        )
+                    )
+            result[table[len("benchmark_") :]] = len(answers) / (
+                time.perf_counter() - start
+            )
+
+            # Both tables must return the same answers
+            assert expected is None or expected == answers
+            expected = answers
+
+        connection.rollback()
+
+    return result
+
+
+def measure_import_time(module):
+    """
+    Measures the cold import time of a module in a new Python interpreter with
+    python -X importtime (the start of the interpreter itself is not included).
+
+    @module: is the name of the module in the app directory
+    @return: the import time in seconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # import time: self [us] | cumulative [us] | module
+    for line in result.stderr.splitlines():
+        columns = line.split("|")
+        if len(columns) == 3 and columns[2].strip() == module:
+            return int(columns[1]) / 1000000
+
+    raise ValueError("Import time of {} was not measured".format(module))
+
+
+def benchmark_import_time(runs):
+    """
+    Measures the cold import time of the command line applications, which
+    should stay under IMPORT_TIME_BUDGET (heavy libraries are imported lazily).
+
+    @runs: is the number of runs of each import
+    @return: a dictionary with milliseconds of each application
+    """
+    return {
+        module: min(measure_import_time(module) for _ in range(runs)) * 1000
+        for module in IMPORT_TIME_MODULES
+    }
+
+
+# Benchmarks by name -> (function, default sizes, size unit, result unit)
+BENCHMARKS = {
+    "save_daily_report": (
+        benchmark_save_daily_report,
+        BENCHMARK_SAVE_ROWS,
+        "rows",
+        "rows/s",
+    ),
+    "analyze_app_platform": (
+        benchmark_analyze_app_platform,
+        BENCHMARK_ANALYZE_ROWS,
+        "rows",
+        "rows/s",
+    ),
+    "cluster_daily_report": (
+        benchmark_cluster_daily_report,
+        BENCHMARK_CLUSTER_ROWS,
+        "rows",
+        "rows/s",
+    ),
+    "range_query": (benchmark_range_query, BENCHMARK_RANGE_ROWS, "rows", "queries/s"),
+    "import_time": (benchmark_import_time, BENCHMARK_IMPORT_RUNS, "runs", "ms"),
+    "pipeline": (benchmark_pipeline, BENCHMARK_PIPELINE_ROWS, "rows", "ms"),
+    "memory": (benchmark_memory, BENCHMARK_MEMORY_ROWS, "rows", "bytes/row"),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a benchmark.")
+    parser.add_argument("benchmark", choices=list(BENCHMARKS))
+    parser.add_argument("sizes", nargs="*", type=int, metavar="SIZE")
+    parser.add_argument("--output", help="file for the JSON report of the results")
+    # Dirtiness of the synthetic reports (pipeline benchmark)
+    parser.add_argument("--currency", default=BENCHMARK_PIPELINE_CURRENCY)
+    parser.add_argument("--bad-dates", type=float, default=BENCHMARK_PIPELINE_BAD_DATES)
+    parser.add_argument("--invalid", type=float, default=BENCHMARK_PIPELINE_INVALID)
+    parser.add_argument("--no-totals", action="store_true")
+    arguments = parser.parse_args()
+
+    benchmark, benchmark_sizes, size_unit, result_unit = BENCHMARKS[
+        arguments.benchmark
+    ]
+    benchmark_options = {}
+    if benchmark is benchmark_pipeline:
+        benchmark_options = {
+            "currency": arguments.currency,
+            "bad_dates": arguments.bad_dates,
+            "invalid": arguments.invalid,
+            "totals": not arguments.no_totals,
+        }
+
+    results = {}
+    for temp_size in arguments.sizes or benchmark_sizes:
+        temp_result = benchmark(temp_size, **benchmark_options)
+        results[temp_size] = temp_result
+        logger_benchmark.info(
+            "{} {} {}: {}".format(
+                arguments.benchmark,
+                temp_size,
+                size_unit,
+                ", ".join(
+                    "{} {:.0f} {}".format(key, value, result_unit)
+                    for key, value in temp_result.items()
+                ),
+            )
+        )
+
+    # Comparable report of the run (e.g. for checking regressions)
+    if arguments.output:
+        with open(arguments.output, "w") as temp_file:
+            json.dump(
+                {
+                    "benchmark": arguments.benchmark,
+                    "options": benchmark_options,
+                    "size_unit": size_unit,
+                    "result_unit": result_unit,
+                    "results": {
+                        str(size): result for size, result in results.items()
+                    },
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                },
+                temp_file,
+                indent=2,
+            )
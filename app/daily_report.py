@@ -2,34 +2,89 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
+import io
 import sys
+import contextlib
 import analyze
-import requests
-import pandas as pd
-from datetime import datetime
-from ad_network import read_ad_network
+from datetime import datetime, timedelta
+from ad_network import read_ad_network, AD_NETWORK_TABLE_NAME
 
 # Import from utils
 from utils.logger import get_logger
 from utils.currency import read_currency
-from utils.app_name_const import APP_NAME
+from utils.cache import ttl_cache, REPORT_QUERY_CACHE_TTL, REPORT_QUERY_CACHE_SIZE
 from utils.revenue import convert_revenue
-from utils.database import database_execute
+from utils.database import (
+    database_copy,
+    database_execute,
+    database_transaction,
+    database_autocommit,
+)
 from utils.date_format_const import DATE_FORMAT
 from utils.date import is_date, convert_date, convert_date_data_frame
+from utils.report_cache import report_cache
+from utils.http_session import http_get, get_validators, save_validators
+from utils.lazy_import import lazy_import
+from utils.schema import compact_chunk, concat_chunks
+from utils.metrics import (
+    metrics_stage_seconds,
+    metrics_rows_read,
+    metrics_rows_rejected,
+    metrics_rows_written,
+)
 
+# Import heavy libraries lazily
+pd = lazy_import("pandas")
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+
+# Get module logger
+logger_app = get_logger(__name__)
 
 
 # Constants
 DAILY_REPORT_TABLE_NAME = "daily_report"
+DAILY_REPORT_STAGING_TABLE_NAME = "daily_report_staging"
+READ_CHUNK_ROWS = 65536  # number of CSV rows parsed at once
+DAILY_REPORT_PARTITION_LOCK = 70217  # key of the advisory lock of partition DDL
+CLUSTER_COLUMNS = ["Date", "App", "Platform"]
+# Group by options of read_report -> column
+REPORT_GROUP_BY = {
+    "date": "report_date",
+    "ad_network": "ad_network_name",
+    "app": "report_app",
+    "platform": "report_platform",
+}
+DAILY_REPORT_COLUMNS = [
+    "report_date",
+    "report_app",
+    "report_platform",
+    "report_requests",
+    "report_impressions",
+    "report_revenue",
+    "currency_usd_id",
+    "ad_network_id",
+]
+# Natural key of a daily report row (unique constraint of the table)
+DAILY_REPORT_KEY = ["report_date", "report_app", "report_platform", "ad_network_id"]
+# Reimported rows replace the values of the existing rows
+DAILY_REPORT_UPSERT = (
+    "ON CONFLICT ({}) DO UPDATE SET {}, report_updated_at = NOW()".format(
+        ", ".join(DAILY_REPORT_KEY),
+        ", ".join(
+            "{column} = EXCLUDED.{column}".format(column=column)
+            for column in DAILY_REPORT_COLUMNS
+            if column not in DAILY_REPORT_KEY
+        ),
+    )
+)
 
 
-def save_daily_report(data, many=False):
+def save_daily_report(data, many=False, partitions=True):
     """
-    Saves daily reports into the database.
+    Saves daily reports into the database. A row which already exists for the
+    same date, app, platform and Ad Network is updated, so reimports are
+    idempotent. The monthly partitions of the rows are created first, unless
+    the caller already created them.
 
     If many is True, then data is a list of lists. -> [(date, app, platform, ...), ...]
     If many is False, then data is a list. -> (date, app, platform, ...)
@@ -37,15 +92,22 @@ def save_daily_report(data, many=False):
     @data: is a list or a list of lists (depending on the value of many) which
     contains the data to be saved
     @many: is a boolean which indicates if data is a list of lists or a list
+    @partitions: is a boolean which indicates if the monthly partitions should be
+    created (on their own connection, so not inside a transaction which must
+    only hold its own connection)
     @return: True if the data was saved successfully, False otherwise
     """
+    dates = [row[0] for row in data] if many else [data[0]]
+    if partitions and not create_daily_report_partitions(dates):
+        return False
+
     return database_execute(
         data=data,
         query="INSERT INTO {} (report_date, report_app, \
                 report_platform, report_requests, report_impressions, \
                 report_revenue, currency_usd_id, ad_network_id) \
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)".format(
-            DAILY_REPORT_TABLE_NAME
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s) {}".format(
+            DAILY_REPORT_TABLE_NAME, DAILY_REPORT_UPSERT
         ),
         logger=logger_app,
         logger_message="Data was saved successfully",
@@ -53,37 +115,369 @@ def save_daily_report(data, many=False):
     )
 
 
-def read_daily_report(url):
+def read_missing_partitions(names):
+    """
+    Returns the names of the partitions which don't exist yet.
+
+    @names: is an iterable of partition names (e.g. daily_report_2017_09)
+    @return: a list of names or None if the partitions can't be read
     """
-    Reads the data from the URL and returns it.
+    names = list(names)
+    result = database_execute(
+        data=(names,),
+        query="SELECT relname FROM pg_class WHERE relname = ANY(%s)",
+        logger=logger_app,
+        logger_message="Partitions were read",
+        fetch_all=True,
+    )
+    if result is False:
+        return None
+
+    existing = {name for name, in result}
+    return [name for name in names if name not in existing]
+
+
+def create_daily_report_partitions(
+    dates, table=DAILY_REPORT_TABLE_NAME, transaction=False
+):
+    """
+    Creates the monthly partitions of the daily_report table (named
+    daily_report_YYYY_MM) for the given dates if they don't exist yet. Rows can
+    only be saved into the table if the partition of their month exists.
+
+    The missing partitions are created on their own connection and committed
+    at once under an advisory lock, so concurrent workers which save the first
+    report of a month don't race each other and the lock of the parent table
+    isn't held until the report is committed.
+
+    @dates: is an iterable of dates (YYYY-MM-DD)
+    @table: is the name of the partitioned table
+    @transaction: is a boolean which indicates if the partitions are created in
+    the transaction of the current thread (e.g. if the table was created in it)
+    @return: True if the partitions exist, False otherwise
+    """
+    partitions = {}
+    for month in sorted({str(date)[:7] for date in dates}):
+        start = datetime.strptime(month, "%Y-%m")
+        end = (start + timedelta(days=32)).replace(day=1)
+        name = "{}_{}".format(table, start.strftime("%Y_%m"))
+        partitions[name] = "CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} \
+            FOR VALUES FROM ('{start}') TO ('{end}')".format(
+            name=name,
+            table=table,
+            start=start.strftime(DATE_FORMAT),
+            end=end.strftime(DATE_FORMAT),
+        )
+
+    if not partitions:
+        return True
+
+    with contextlib.nullcontext() if transaction else database_autocommit():
+        # Only the partitions which don't exist yet take the lock
+        missing = read_missing_partitions(partitions)
+        if missing is None:
+            return False
+        if not missing:
+            return True
+
+        # The lock is held until the partitions are committed
+        result = database_execute(
+            data=(),
+            query="; ".join(
+                ["SELECT pg_advisory_xact_lock({})".format(DAILY_REPORT_PARTITION_LOCK)]
+                + [partitions[name] for name in missing]
+            ),
+            logger=logger_app,
+            logger_message="Partitions were created",
+        )
+
+        # A concurrent transaction might have created the partitions anyway
+        return result is not False or read_missing_partitions(partitions) == []
+
+
+def copy_daily_report(data, partitions=True):
+    """
+    Saves daily reports into the database with a single COPY FROM STDIN
+    statement. The data frame is written into an in-memory CSV buffer, which is
+    much faster than inserting rows one by one. The rows are copied into a
+    temporary staging table and moved into the daily_report table with a single
+    INSERT ... ON CONFLICT DO UPDATE, so reimports are idempotent. The monthly
+    partitions of the rows are created first, unless the caller already
+    created them.
+
+    @data: is a data frame with the columns of the daily_report table (date,
+    app, platform, requests, impressions, revenue, currency, ad network)
+    @partitions: is a boolean which indicates if the monthly partitions should be
+    created (on their own connection, so not inside a transaction which must
+    only hold its own connection)
+    @return: True if the data was saved successfully, False otherwise
+    """
+    # Write the data frame into an in-memory CSV buffer (empty values are NULL)
+    buffer = io.StringIO()
+    data.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+
+    if partitions and not create_daily_report_partitions(data.iloc[:, 0].unique()):
+        return False
+
+    columns = ", ".join(DAILY_REPORT_COLUMNS)
+    with database_transaction():
+        result = database_copy(
+            data=buffer,
+            query="COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+                DAILY_REPORT_STAGING_TABLE_NAME, columns
+            ),
+            logger=logger_app,
+            logger_message="Data was copied successfully",
+            before=[
+                "DROP TABLE IF EXISTS {}".format(DAILY_REPORT_STAGING_TABLE_NAME),
+                "CREATE TEMPORARY TABLE {} ON COMMIT DROP AS \
+                    SELECT {} FROM {} WITH NO DATA".format(
+                    DAILY_REPORT_STAGING_TABLE_NAME, columns, DAILY_REPORT_TABLE_NAME
+                ),
+            ],
+            after=[
+                "INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} \
+                    {upsert}".format(
+                    table=DAILY_REPORT_TABLE_NAME,
+                    columns=columns,
+                    staging=DAILY_REPORT_STAGING_TABLE_NAME,
+                    upsert=DAILY_REPORT_UPSERT,
+                )
+            ],
+        )
+
+    return result is not False
+
+
+@ttl_cache(
+    ttl=REPORT_QUERY_CACHE_TTL,
+    valid=lambda result: result is not None,
+    max_size=REPORT_QUERY_CACHE_SIZE,
+)
+def read_report(
+    start_date=None,
+    end_date=None,
+    ad_network=None,
+    app=None,
+    platform=None,
+    group_by=(),
+):
+    """
+    Reads the requests, impressions and revenue of the saved daily reports
+    summed by the given group by options. Results are kept in an LRU cache,
+    whose entries are invalidated when daily_report saves new rows for a
+    matching Ad Network and date (see invalidate_report).
+
+    @start_date: is the first date of the reports (YYYY-MM-DD) or None
+    @end_date: is the last date of the reports (YYYY-MM-DD) or None
+    @ad_network: is the name of the Ad Network or None for all Ad Networks
+    @app: is the name of the app or None for all apps
+    @platform: is the name of the platform or None for all platforms
+    @group_by: is a tuple of group by options (date, ad_network, app, platform)
+    @return: a list of dictionaries (one for each group) or None if the reports
+    can't be read
+    """
+    # Build the filters of the query
+    filters = {
+        "report_date >= %s": start_date,
+        "report_date <= %s": end_date,
+        "ad_network_name = %s": ad_network,
+        "report_app = %s": app,
+        "report_platform = %s": platform,
+    }
+    filters = {key: value for key, value in filters.items() if value is not None}
+    columns = [REPORT_GROUP_BY[option] for option in group_by]
+
+    query = "SELECT {} SUM(report_requests), SUM(report_impressions), \
+        SUM(report_revenue) FROM {} LEFT JOIN {} USING (ad_network_id)".format(
+        "".join(column + ", " for column in columns),
+        DAILY_REPORT_TABLE_NAME,
+        AD_NETWORK_TABLE_NAME,
+    )
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    if columns:
+        query += " GROUP BY {columns} ORDER BY {columns}".format(
+            columns=", ".join(columns)
+        )
+
+    result = database_execute(
+        data=tuple(filters.values()),
+        query=query,
+        logger=logger_app,
+        logger_message="Report was read from database",
+        fetch_all=True,
+    )
+    if result is False:
+        return None
+
+    report = []
+    for row in result:
+        temp_report = dict(zip(group_by, row))
+        if "date" in temp_report:
+            temp_report["date"] = temp_report["date"].strftime(DATE_FORMAT)
+        requests, impressions, revenue = row[len(columns) :]
+        temp_report["requests"] = int(requests or 0)
+        temp_report["impressions"] = int(impressions or 0)
+        temp_report["revenue"] = float(revenue or 0)
+        report.append(temp_report)
+
+    return report
+
+
+def invalidate_report(ad_network, dates):
+    """
+    Removes the cached results of read_report which can contain the rows of the
+    Ad Network on the given dates.
+
+    @ad_network: is the name of the Ad Network
+    @dates: is an iterable of dates (YYYY-MM-DD)
+    """
+    dates = {str(date) for date in dates}
+
+    def matches(key):
+        start_date, end_date, name = key[:3]
+        return name in (None, ad_network) and any(
+            (start_date is None or start_date <= date)
+            and (end_date is None or date <= end_date)
+            for date in dates
+        )
+
+    read_report.cache.invalidate_where(matches)
+
+
+def parse_daily_report(stream, chunksize=READ_CHUNK_ROWS):
+    """
+    Parses a CSV daily report from a file-like object in chunks of rows with
+    the C parser of pandas. Each chunk is converted into the compact schema
+    (see compact_chunk) right after it is parsed, so the strings of the whole
+    report are never held in memory. Invalid values are still validated by the
+    analysis.
+
+    @stream: is a file-like object with the CSV data
+    @chunksize: is the number of rows in each chunk
+    @return: a generator of data frames
+    """
+    chunks = pd.read_csv(
+        stream,
+        dtype=str,
+        keep_default_na=False,
+        engine="c",
+        chunksize=chunksize,
+    )
+
+    return (compact_chunk(chunk) for chunk in chunks)
+
+
+def is_not_modified(data):
+    """
+    Checks if the data frame marks a report which was not modified since it
+    was last processed.
+
+    @data: is a data frame returned by read_daily_report or daily_report
+    @return: True if the report was not modified, False otherwise
+    """
+    return data is not None and data.attrs.get("not_modified", False)
+
+
+def read_daily_report(url, conditional=False, cache_key=None):
+    """
+    Reads the data from the URL and returns it. The response body is streamed
+    and parsed in chunks, so the raw report is never held in memory as a whole.
+    The validators of the response (ETag, Last-Modified) are stored in the
+    attrs of the data frame.
+
+    If conditional is True and the report was not modified since its
+    validators were saved, an empty data frame marked as not modified is
+    returned (see is_not_modified).
+
+    If cache_key is given, the raw report is also written into the report cache
+    while it is downloaded, so it can be reprocessed with read_cached_report.
 
     @url: is the URL of the data to be read
+    @conditional: is a boolean which indicates if the request is conditional
+    @cache_key: is a tuple (ad_network, date) of the report cache or None
     @return: a data frame of the data
     """
     try:
         # Get the data from URL
-        response = requests.get(url)
+        response = http_get(url, conditional=conditional, stream=True)
         status_code = response.status_code
     except:
         logger_app.error("There was an error while reading the data from URL")
         return None
 
-    # Check if the request was successful
-    if not status_code == 200:
-        logger_app.info("Google Storage request was unsuccessful")
-        return None
+    with response:
+        # Check if the report was modified since the last import
+        if status_code == 304:
+            logger_app.info("Google Storage report was not modified")
+            df = pd.DataFrame()
+            df.attrs["not_modified"] = True
+            return df
+
+        # Check if the request was successful
+        if not status_code == 200:
+            logger_app.info("Google Storage request was unsuccessful")
+            return None
+
+        logger_app.info("Google Storage request was successful")
+        # Decompress the body if needed and parse it while it is downloaded
+        response.raw.decode_content = True
+        stream = response.raw
+
+        # Write the raw report into the report cache while it is parsed
+        reader = None
+        if cache_key and report_cache.max_size > 0:
+            try:
+                reader = stream = report_cache.open_writer(stream)
+            except OSError:
+                logger_app.warning("Report cache is not writable")
+
+        try:
+            df = concat_chunks(parse_daily_report(stream))
+        except:
+            logger_app.error("There was an error while parsing the data from URL")
+            if reader is not None:
+                report_cache.discard(reader)
+            return None
+
+        if reader is not None:
+            try:
+                report_cache.save(*cache_key, reader)
+            except OSError:
+                logger_app.warning("Report was not saved into the report cache")
+
+    df.attrs["validators"] = get_validators(response)
+    return df
+
 
-    logger_app.info("Google Storage request was successful")
-    data = response.text.splitlines()
+def read_cached_report(ad_network, date):
+    """
+    Reads the raw report of the Ad Network and date from the report cache
+    without touching the network.
+
+    @ad_network: is the name of the ad network
+    @date: is the date of the report (YYYY-MM-DD)
+    @return: a data frame of the data or None if the report is not cached
+    """
+    file = report_cache.open(ad_network, date)
+    if file is None:
+        logger_app.error("Report is not in the report cache")
+        return None
 
-    df_columns = data[0].split(",")
-    df_rows = [report.split(",") for report in data[1:]]
+    with file:
+        try:
+            df = concat_chunks(parse_daily_report(file))
+        except:
+            logger_app.error("There was an error while parsing the cached report")
+            return None
 
-    df = pd.DataFrame(df_rows, columns=df_columns)
+    logger_app.info("Report was read from the report cache")
     return df
 
 
-def fix_daily_report(data, update=True):
+def fix_daily_report(data, update=True, date_format=analyze.DEFAULT_DATE_FORMAT):
     """
     Finds out the revenue currency and converts it
     to the USD. Function returns a data frame of the data, adding the revenue
@@ -91,14 +485,16 @@ def fix_daily_report(data, update=True):
 
     @url: is the URL of the data to be read
     @update: is a boolean which indicates if the data should be updated
+    @date_format: is the date format of the report rows (DD/MM/YYYY), used as a
+    parsing hint
     @return: a data frame of the data and the currency code
     """
     # Drop last row if it is not date type
-    if not is_date(data.iloc[-1]["Date"]):
+    if not is_date(data.iloc[-1]["Date"], date_format):
         data.drop(index=data.index[-1], axis=0, inplace=True)
 
     # Convert date to format: YYYY-MM-DD
-    data = convert_date_data_frame(data)
+    data = convert_date_data_frame(data, date_format)
     logger_app.info("Convert date to format: YYYY-MM-DD")
 
     # Convert revenue value to USD
@@ -110,22 +506,47 @@ def fix_daily_report(data, update=True):
 
 def cluster_daily_report(data):
     """
-    Clusters the data by app and platform.
+    Clusters the data by app and platform. Requests and impressions are summed
+    as integers and revenue as a number, directly on the columns. Rows whose
+    revenue is not a number are rejected.
 
     @data: is a data frame of the data
     @return: a data frame of the data
     """
-    # Cluster by app and platform
-    temp_data = data.groupby(["Date", "App", "Platform"]).sum()
-
-    # Create a combination for each app and platform
-    cluster_data = []
-    for combination in temp_data.itertuples():
-        cluster_data.append([*combination[0], *combination[1:]])
-        
     try:
-        # Convert data back to data frame
-        data = pd.DataFrame(cluster_data, columns=data.keys())
+        # Make sure that the summed columns are numeric (strings would be joined)
+        # and that the counters are summed as int64 (int32 sums could overflow)
+        numeric = {
+            "Requests": lambda x: pd.to_numeric(x).astype("int64"),
+            "Impressions": lambda x: pd.to_numeric(x).astype("int64"),
+            "Revenue": lambda x: pd.to_numeric(x, errors="coerce"),
+        }
+        data = data.assign(
+            **{
+                column: convert(data[column])
+                for column, convert in numeric.items()
+                if data[column].dtype not in ("int64", "float64")
+            }
+        )
+
+        # Reject the rows whose revenue is not a number (the sum would count
+        # them as zero)
+        invalid = data["Revenue"].isna()
+        if invalid.any():
+            logger_app.warning(
+                "Rows with a revenue which is not numeric were rejected: %s",
+                int(invalid.sum()),
+            )
+            data = data[~invalid]
+            if not len(data):
+                logger_app.error("There is no data with a numeric revenue")
+                return None
+
+        # Cluster by app and platform (only the observed categories)
+        data = data[CLUSTER_COLUMNS + list(numeric)].groupby(
+            CLUSTER_COLUMNS, as_index=False, sort=False, observed=True
+        ).sum()
+        data["Revenue"] = data["Revenue"].round(2)
         logger_app.info("Cluster by app and platform")
     except:
         logger_app.error("There was an error while clustering the data")
@@ -134,7 +555,15 @@ def cluster_daily_report(data):
     return data
 
 
-def daily_report(ad_network, date, logger=None, update=True, save=True):
+def daily_report(
+    ad_network,
+    date,
+    logger=None,
+    update=True,
+    save=True,
+    conditional=True,
+    replay=False,
+):
     """
     Takes ad_network and date as input, creates a valid URL, reads the data from
     created URL, edits the data (converts date to format YYYY-MM-DD,
@@ -146,11 +575,15 @@ def daily_report(ad_network, date, logger=None, update=True, save=True):
     @logger: is the logger object
     @update: is a boolean which indicates if the currency data should be updated
     @save: is a boolean which indicates if the data should be saved into the database
+    @conditional: is a boolean which indicates if a saved report should be skipped
+    when it was not modified since the last import
+    @replay: is a boolean which indicates if the report should be reprocessed
+    from the report cache without touching the network
     @return: a data frame of the retrieved data
     """
     # Replace the logger if it is provided
     if logger:
-        # Get app logger
+        # Get module logger
         global logger_app
         logger_app = logger
 
@@ -164,7 +597,12 @@ def daily_report(ad_network, date, logger=None, update=True, save=True):
         logger_app.error("Date is not valid")
         return None
 
+    # Don't call the exchange rates API when reprocessing from the cache
+    if replay:
+        update = False
+
     # Get the ad network and date format
+    cache_key = (ad_network, date)
     ad_network = read_ad_network(ad_network)
 
     # Check if the ad_network was found
@@ -183,61 +621,157 @@ def daily_report(ad_network, date, logger=None, update=True, save=True):
     # Format the ad network URL for a specific date
     url = url.format(date)
 
-    # Read the data from the URL
-    data = read_daily_report(url)
+    # Metrics of the stages and rows are labeled by the Ad Network
+    name = cache_key[0]
+
+    def stage(stage_name):
+        return metrics_stage_seconds.time(stage=stage_name, ad_network=name)
+
+    # Read the data from the report cache or from the URL
+    if replay:
+        with stage("read_cached_report"):
+            data = read_cached_report(*cache_key)
+    else:
+        with stage("read_daily_report"):
+            data = read_daily_report(
+                url, conditional=save and conditional, cache_key=cache_key
+            )
     if data is None:
         logger_app.error("Data was not read from URL")
         return None
 
+    # Skip the report, because it was already imported
+    if is_not_modified(data):
+        logger_app.info("Daily report was not modified since the last import")
+        return data
+
     # Don't save data and return it
     if not save:
         return data
 
+    validators = data.attrs.get("validators")
+    rows = len(data)
+    metrics_rows_read.inc(rows, ad_network=name)
+
     # Data analysis from problem 2 (ignore if data is not valid)
-    data, _ = analyze.analyze(data)
+    with stage("analyze"):
+        data, _ = analyze.analyze(data)
+    rejected = rows if data is None else rows - len(data)
+    metrics_rows_rejected.inc(rejected, ad_network=name)
+    if data is None or not len(data):
+        logger_app.error("There is no valid data for the given date")
+        return None
 
-    # Fix the data and prepare it to be saved
-    data, currency = fix_daily_report(data, update)
+    # Fix the data and prepare it to be saved (the dates of the rows are
+    # DD/MM/YYYY, the date format of the Ad Network is only used in its URL)
+    with stage("fix_daily_report"):
+        data, currency = fix_daily_report(data, update, analyze.DEFAULT_DATE_FORMAT)
 
     # Check if data exists
     if data is None:
         logger_app.error("There is no data for the given date")
         return None
 
-    # Get the currency id
-    currency_id = None
-    if currency:
-        currency_id = read_currency(currency)[0]
-
     # Cluster the data into groups of apps and platforms
-    data = cluster_daily_report(data)
-
-    # Check if the data is valid
-    try:
-        temp_data = data.copy()
-        # Set new columns for data frame
-        temp_data["currency"] = currency_id
-        temp_data["ad_network"] = ad_network_id
+    with stage("cluster_daily_report"):
+        data = cluster_daily_report(data)
 
-        # Save data to the database
-        save_daily_report(temp_data.to_numpy(), True)
-    except:
-        logger_app.error("Data is not valid")
+    # Create the missing monthly partitions (committed on their own connection)
+    if not create_daily_report_partitions(data["Date"].unique()):
+        logger_app.error("Data was not saved")
         return None
 
+    # Save the report on a single pooled database connection, the transaction
+    # is opened only now, so the connection doesn't idle in it while the report
+    # is downloaded and processed
+    with database_transaction():
+        # Get the currency id
+        currency_id = None
+        if currency:
+            currency_id = read_currency(currency)[0]
+
+        # Check if the data is valid
+        try:
+            # Set new columns for data frame
+            temp_data = data.assign(currency=currency_id, ad_network=ad_network_id)
+
+            # Save data to the database (fall back to inserts if COPY fails), the
+            # partitions were already created, so the transaction holds only
+            # its own connection
+            with stage("save_daily_report"):
+                saved = copy_daily_report(temp_data, False) or save_daily_report(
+                    temp_data.to_numpy(), True, False
+                )
+        except:
+            logger_app.error("Data is not valid")
+            return None
+
+        if not saved:
+            logger_app.error("Data was not saved")
+            return None
+
+        metrics_rows_written.inc(len(data), ad_network=name)
+
+    # Cached report queries which contain the saved rows are not valid anymore
+    invalidate_report(cache_key[0], data["Date"].unique())
+
+    # Remember the version of the report, so an unchanged report is skipped
+    if not replay:
+        save_validators(url, validators)
+
     return data
 
 
 if __name__ == "__main__":
-    try:
-        ad_network = sys.argv[1]
-        date = sys.argv[2]
-        # Check if the user wants to update the data
-        update = False
-        if len(sys.argv) == 4:
-            update = sys.argv[3].lower() == "update" or sys.argv[3].lower() == "true"
+    import json
+    import time
+    import argparse
 
-        daily_report(ad_network, date, save=update)
-    except:
-        logger_app.info("Usage: python app.py <ad_network> <date> <save>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Processes the daily report of an Ad Network for a date."
+    )
+    parser.add_argument("ad_network", help="name of the Ad Network")
+    parser.add_argument("date", help="date of the report (YYYY-MM-DD)")
+    parser.add_argument(
+        "save",
+        nargs="?",
+        default="false",
+        help="save the daily report into the database (true/false)",
+    )
+    parser.add_argument(
+        "--no-update", action="store_true", help="don't update currency rates"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="reimport an unchanged report"
+    )
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        data = daily_report(
+            arguments.ad_network,
+            arguments.date,
+            update=not arguments.no_update,
+            save=arguments.save.lower() in ("true", "save", "update", "yes", "y"),
+            conditional=not arguments.force,
+        )
+    except Exception as error:
+        logger_app.error("Daily report failed: {}".format(error))
+        data = None
+
+    # Machine-readable summary of the job
+    skipped = is_not_modified(data)
+    success = skipped or (data is not None and len(data) > 0)
+    json.dump(
+        {
+            "ad_network": arguments.ad_network,
+            "date": arguments.date,
+            "success": bool(success),
+            "skipped": bool(skipped),
+            "rows": 0 if data is None else len(data),
+            "time": round(time.perf_counter() - start, 3),
+        },
+        sys.stdout,
+    )
+    sys.stdout.write("\n")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+from utils.logger import get_logger
+from utils.cache import ttl_cache
+from utils.app_const import DEFAULT_APP
+from utils.database import database_execute, database_autocommit
+from utils.platform_const import DEFAULT_PLATFORM
+
+
+# Get module logger
+logger_app = get_logger(__name__)
+
+
+# Constants
+APP_TABLE_NAME = "app"
+PLATFORM_TABLE_NAME = "platform"
+
+
+def save_app(data, many=False):
+    """
+    Saves the Apps7 app names into the database.
+
+    If many is True, then data is a list of lists. -> [(name,), ...]
+    If many is False, then data is a list. -> (name,)
+
+    @data: is a list or a list of lists (depending on the value of many) which
+    contains the data to be saved
+    @many: is a boolean which indicates if data is a list of lists or a list
+    @return: True if the data was saved successfully, False otherwise
+    """
+    result = database_execute(
+        data=data,
+        query="INSERT INTO {} (app_name) VALUES (%s)".format(APP_TABLE_NAME),
+        logger=logger_app,
+        logger_message="Data was saved successfully",
+        many=many,
+    )
+
+    # Cached apps are not valid anymore
+    read_app.cache.invalidate()
+
+    return result
+
+
+def save_platform(data, many=False):
+    """
+    Saves the platform names into the database.
+
+    If many is True, then data is a list of lists. -> [(name,), ...]
+    If many is False, then data is a list. -> (name,)
+
+    @data: is a list or a list of lists (depending on the value of many) which
+    contains the data to be saved
+    @many: is a boolean which indicates if data is a list of lists or a list
+    @return: True if the data was saved successfully, False otherwise
+    """
+    result = database_execute(
+        data=data,
+        query="INSERT INTO {} (platform_name) VALUES (%s)".format(
+            PLATFORM_TABLE_NAME
+        ),
+        logger=logger_app,
+        logger_message="Data was saved successfully",
+        many=many,
+    )
+
+    # Cached platforms are not valid anymore
+    read_platform.cache.invalidate()
+
+    return result
+
+
+@ttl_cache(valid=lambda result: result is not None)
+def read_app():
+    """
+    Reads the names of all Apps7 apps from database. If the table is empty, the
+    default apps are returned. The query runs on its own connection, so a
+    failed query doesn't abort the transaction of the current thread, and only
+    the names which were read are cached.
+
+    @return: a frozenset of app names or None if the table can't be read
+    """
+    with database_autocommit():
+        result = database_execute(
+            data=(),
+            query="SELECT app_name FROM {}".format(APP_TABLE_NAME),
+            logger=logger_app,
+            logger_message="Data was retrieved from database",
+            fetch_all=True,
+        )
+
+    if result is False:
+        return None
+
+    if not result:
+        return frozenset(DEFAULT_APP)
+
+    return frozenset(app for app, in result)
+
+
+@ttl_cache(valid=lambda result: result is not None)
+def read_platform():
+    """
+    Reads the names of all platforms from database. If the table is empty, the
+    default platforms are returned. The query runs on its own connection, so
+    a failed query doesn't abort the transaction of the current thread, and only
+    the names which were read are cached.
+
+    @return: a frozenset of platform names or None if the table can't be read
+    """
+    with database_autocommit():
+        result = database_execute(
+            data=(),
+            query="SELECT platform_name FROM {}".format(PLATFORM_TABLE_NAME),
+            logger=logger_app,
+            logger_message="Data was retrieved from database",
+            fetch_all=True,
+        )
+
+    if result is False:
+        return None
+
+    if not result:
+        return frozenset(DEFAULT_PLATFORM)
+
+    return frozenset(platform for platform, in result)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import sys
+import time
+import argparse
+from utils.logger import get_logger
+from utils.currency import refresh_exchange_rates
+
+
+# Get module logger
+logger_app = get_logger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Refreshes the exchange rates of all currencies."
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="refresh every INTERVAL seconds instead of only once",
+    )
+    arguments = parser.parse_args()
+
+    try:
+        while True:
+            result = refresh_exchange_rates(logger_app)
+            if not arguments.interval:
+                sys.exit(0 if result else 1)
+
+            time.sleep(arguments.interval)
+    except KeyboardInterrupt:
+        logger_app.info("Stopping exchange rates refresh ...")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import os
+import time
+import uuid
+import queue
+import threading
+from dotenv import load_dotenv
+from collections import OrderedDict
+from utils.logger import get_logger
+
+
+# Get module logger
+logger_app = get_logger(__name__)
+
+# Load the .env file
+load_dotenv()
+
+# Jobs (each worker holds one pooled connection at a time, so JOB_WORKERS should
+# not exceed DATABASE_POOL_MAX)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS") or 4)
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE") or 100)
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE") or 1000)
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class Job:
+    """
+    A call of a function which is run by a worker of a JobQueue.
+    """
+
+    def __init__(self, arguments):
+        """
+        @arguments: is a dictionary of keyword arguments of the function
+        """
+        self.id = uuid.uuid4().hex
+        self.arguments = arguments
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        """
+        Returns the status of the job.
+
+        @return: a dictionary with the status and the result of the job
+        """
+        return {
+            "id": self.id,
+            "status": self.status,
+            "arguments": self.arguments,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    A bounded queue of jobs which are run by a pool of worker threads. The
+    statuses of the last finished jobs are kept, so they can be looked up by
+    their ids.
+    """
+
+    def __init__(
+        self,
+        function,
+        workers=JOB_WORKERS,
+        max_size=JOB_QUEUE_SIZE,
+        history_size=JOB_HISTORY_SIZE,
+    ):
+        """
+        @function: is the function which is called with the arguments of a job
+        and returns its result (an exception fails the job)
+        @workers: is the number of worker threads
+        @max_size: is the maximum number of queued jobs
+        @history_size: is the maximum number of kept finished jobs
+        """
+        self.function = function
+        self.history_size = history_size
+        self._queue = queue.Queue(max_size)
+        self._jobs = OrderedDict()  # id -> job
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._workers = [
+            threading.Thread(
+                target=self._work, name="job-{}".format(index), daemon=True
+            )
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, **arguments):
+        """
+        Adds a job to the queue.
+
+        @arguments: are the keyword arguments of the function
+        @return: the id of the job or None if the queue is full
+        """
+        job = Job(arguments)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                return None
+
+            self._jobs[job.id] = job
+            self._forget()
+
+        return job.id
+
+    def get(self, job_id):
+        """
+        Returns the status of a job.
+
+        @job_id: is the id of the job
+        @return: a dictionary with the status of the job or None if the job
+        doesn't exist
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+        return job.to_dict() if job else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Waits until a job is finished and returns its status.
+
+        @job_id: is the id of the job
+        @timeout: is the maximum number of seconds to wait or None
+        @return: a dictionary with the status of the job or None if the job
+        doesn't exist
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+        if job is None:
+            return None
+
+        job.done.wait(timeout)
+        return job.to_dict()
+
+    def wait_any(self, timeout=None):
+        """
+        Waits until any job is finished (e.g. to submit a job into a full queue
+        again).
+
+        @timeout: is the maximum number of seconds to wait or None
+        """
+        with self._finished:
+            self._finished.wait(timeout)
+
+    def as_completed(self, job_ids, timeout=None):
+        """
+        Yields the statuses of the jobs in the order in which they finish.
+
+        @job_ids: is a list of job ids
+        @timeout: is the maximum number of seconds to wait for all jobs or None
+        @return: a generator of dictionaries with the statuses of the jobs
+        (unfinished jobs are yielded last when the timeout expires)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            pending = [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+        while pending:
+            with self._finished:
+                finished = [job for job in pending if job.done.is_set()]
+                while not finished:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            finished = list(pending)
+                            break
+
+                    self._finished.wait(remaining)
+                    finished = [job for job in pending if job.done.is_set()]
+
+            for job in finished:
+                pending.remove(job)
+                yield job.to_dict()
+
+    def stats(self):
+        """
+        Returns the statistics of the queue.
+
+        @return: a dictionary with the number of jobs in each status
+        """
+        with self._lock:
+            result = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_SUCCEEDED: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                result[job.status] += 1
+
+        return result
+
+    def _forget(self):
+        """
+        Removes the oldest finished jobs above the history size (the lock must
+        be held).
+        """
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in (JOB_SUCCEEDED, JOB_FAILED)
+        ]
+        for job_id in finished[: max(len(finished) - self.history_size, 0)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        """
+        Runs the queued jobs one by one.
+        """
+        while True:
+            job = self._queue.get()
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+
+            try:
+                job.result = self.function(**job.arguments)
+                job.status = JOB_SUCCEEDED
+            except Exception as error:
+                logger_app.error("Job {} failed: {}".format(job.id, error))
+                job.error = str(error) or type(error).__name__
+                job.status = JOB_FAILED
+
+            job.finished_at = time.time()
+            with self._finished:
+                self._forget()
+                job.done.set()
+                self._finished.notify_all()
+
+            self._queue.task_done()
@@ -2,13 +2,18 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
-from utils.app_name_const import APP_NAME
+import io
+import sys
+import json
+import argparse
 from utils.logger import get_logger
-from daily_report import daily_report
+from daily_report import daily_report, is_not_modified
+from utils.metrics import render_metrics
+from backfill import BACKFILL_WORKERS, BACKFILL_NETWORK_WORKERS, read_jobs, run_jobs
 
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+# Get module logger
+logger_app = get_logger(__name__)
 
 
 def read_main():
@@ -95,7 +100,9 @@ def main():
                 data = daily_report(ad_network, date, logger_app, update, save)
             except:
                 data = None
-            if data is not None and len(data):
+            if is_not_modified(data):
+                logger_app.info("Daily report is already up to date")
+            elif data is not None and len(data):
                 logger_app.info("Program has finished successfully")
             else:
                 logger_app.info("Program has finished unsuccessfully")
@@ -119,5 +126,120 @@ def main():
     return
 
 
+def read_stdin_jobs():
+    """
+    Checks if the standard input carries jobs. A terminal is never read, other
+    input is read at once and put back, so the prompts can still read it (e.g.
+    if it is empty, like the input of a container which was run without -i).
+
+    @return: True if the standard input carries jobs, False otherwise
+    """
+    if sys.stdin.isatty():
+        return False
+
+    data = sys.stdin.read()
+    sys.stdin = io.StringIO(data)
+    try:
+        return bool(read_jobs(data.splitlines()))
+    except ValueError:
+        return False
+
+
+def batch_main(argv=None):
+    """
+    Non-interactive version of the application. The jobs (Ad Network and date)
+    are read from the arguments, a file or the standard input and are run in
+    parallel in a single process. A JSON summary with the timings of all jobs is
+    written to the standard output (or a file), the logs go to the standard
+    error.
+
+    @argv: is a list of command line arguments (sys.argv[1:] by default)
+    @return: the exit code (0 if all jobs succeeded, 1 otherwise)
+    """
+    parser = argparse.ArgumentParser(
+        description="Runs daily reports of Ad Networks without prompts.",
+        epilog="Jobs are CSV (AD_NETWORK,DATE) or JSON lines "
+        '({"ad_network": ..., "date": ...}).',
+    )
+    parser.add_argument(
+        "jobs", nargs="*", metavar="AD_NETWORK,DATE", help="jobs to be run"
+    )
+    parser.add_argument(
+        "--file",
+        action="append",
+        default=[],
+        help="file with one job per line (- for the standard input)",
+    )
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--network-workers", type=int, default=BACKFILL_NETWORK_WORKERS)
+    parser.add_argument(
+        "--no-update", action="store_true", help="don't update currency rates"
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="don't save the daily reports"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="reimport unchanged reports"
+    )
+    parser.add_argument(
+        "--replay", action="store_true", help="reprocess reports from the cache"
+    )
+    parser.add_argument("--summary", help="file for the JSON summary (default stdout)")
+    parser.add_argument("--metrics", help="file for the metrics (Prometheus text)")
+    arguments = parser.parse_args(argv)
+
+    # Read the standard input if there are no other jobs and it is not a terminal
+    files = arguments.file
+    if not files and not arguments.jobs and not sys.stdin.isatty():
+        files = ["-"]
+
+    try:
+        jobs = read_jobs(arguments.jobs)
+        for file in files:
+            if file == "-":
+                jobs += read_jobs(sys.stdin)
+            else:
+                with open(file) as temp_file:
+                    jobs += read_jobs(temp_file)
+    except (OSError, ValueError) as error:
+        logger_app.error(str(error))
+        return 1
+
+    if not jobs:
+        parser.print_usage(sys.stderr)
+        logger_app.error("There are no jobs to run")
+        return 1
+
+    summary = run_jobs(
+        jobs,
+        workers=arguments.workers,
+        network_workers=arguments.network_workers,
+        update=not arguments.no_update,
+        save=not arguments.no_save,
+        conditional=not arguments.force,
+        replay=arguments.replay,
+        logger=logger_app,
+        name="Job",
+    )
+
+    if arguments.summary:
+        with open(arguments.summary, "w") as temp_file:
+            json.dump(summary, temp_file, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if arguments.metrics:
+        with open(arguments.metrics, "w") as temp_file:
+            temp_file.write(render_metrics())
+
+    return 1 if summary["failed"] else 0
+
+
 if __name__ == "__main__":
+    # Without arguments (and without jobs on the standard input) the application
+    # asks for the input
+    if len(sys.argv) > 1 or read_stdin_jobs():
+        sys.exit(batch_main())
+
     main()
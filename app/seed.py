@@ -4,8 +4,10 @@
 # Import libraries
 from utils.logger import get_logger
 from ad_network import save_ad_network
+from dimension import save_app, save_platform
+from utils.app_const import DEFAULT_APP
+from utils.platform_const import DEFAULT_PLATFORM
 from utils.currency import save_currency
-from utils.app_name_const import APP_NAME
 from utils.currency_const import (
     DEFAULT_EUR_USD,
     DEFAULT_GBP_USD,
@@ -14,8 +16,8 @@ from utils.currency_const import (
 )
 
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+# Get module logger
+logger_app = get_logger(__name__)
 
 # Constants
 SEED_CURRENCY_DATA = [
@@ -37,6 +39,8 @@ SEED_AD_NETWORK_DATA = [
         "%-d_%-m_%Y",
     ),
 ]
+SEED_APP_DATA = [(app,) for app in DEFAULT_APP]
+SEED_PLATFORM_DATA = [(platform,) for platform in DEFAULT_PLATFORM]
 
 
 def seed():
@@ -46,9 +50,11 @@ def seed():
     logger_app.info("Seeding the database ...")
     currency = save_currency(data=SEED_CURRENCY_DATA, many=True)
     ad_network = save_ad_network(data=SEED_AD_NETWORK_DATA, many=True)
+    app = save_app(data=SEED_APP_DATA, many=True)
+    platform = save_platform(data=SEED_PLATFORM_DATA, many=True)
 
     # Check if seeding was successful
-    if currency and ad_network:
+    if currency and ad_network and app and platform:
         logger_app.info("Seeding the database was successful")
     else:
         logger_app.info("Seeding the database was unsuccessful")
@@ -3,75 +3,546 @@
 
 # Import libraries
 import os
+import gzip
 import json
+import time
+import hashlib
 import socketserver
-import pandas as pd
+from itertools import chain
+from urllib.parse import urlsplit, parse_qs
 from dotenv import load_dotenv
+from jobs import JobQueue, JOB_SUCCEEDED, JOB_FAILED
 from utils.logger import get_logger
-from daily_report import daily_report
-from utils.app_name_const import APP_NAME
+from daily_report import daily_report, read_report, REPORT_GROUP_BY
+from utils.date import parse_date
+from utils.date_format_const import DATE_FORMAT
+from utils.metrics import render_metrics, METRICS_CONTENT_TYPE
+from utils.serialize import (
+    negotiate_format,
+    serialize_table,
+    serialize_data_frame,
+    gzip_chunks,
+    FORMAT_JSON,
+)
 from http.server import BaseHTTPRequestHandler
+from utils.lazy_import import lazy_import
 
+# Import heavy libraries lazily
+pd = lazy_import("pandas")
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+
+# Get module logger
+logger_app = get_logger(__name__)
 
 # Load the .env file
 load_dotenv()
 
 # Database
-SERVER = os.getenv("SERVER")
-SERVER_PORT = int(os.getenv("SERVER_PORT"))
+SERVER = os.getenv("SERVER") or "127.0.0.1"
+SERVER_PORT = int(os.getenv("SERVER_PORT") or 8080)
+SERVER_JOB_TIMEOUT = float(os.getenv("SERVER_JOB_TIMEOUT") or 60)
+SERVER_KEEPALIVE_TIMEOUT = float(os.getenv("SERVER_KEEPALIVE_TIMEOUT") or 15)
+
+# Static files
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public")
+STATIC_CACHE_CONTROL = "no-cache"  # cache, but revalidate with the ETag
+STATIC_CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".ico": "image/x-icon",
+}
+STATUS_SUCCESS = '<i class="fa-solid fa-check"></i>'
+STATUS_FAILURE = '<i class="fa-solid fa-xmark"></i>'
+BATCH_SUBMIT_INTERVAL = 1  # seconds between submits while the queue is full
+
+
+class StaticFile:
+    """
+    A file which is rendered and compressed only once and then served from
+    memory.
+    """
+
+    def __init__(self, body, content_type):
+        """
+        @body: is the content of the file (bytes)
+        @content_type: is the content type of the file
+        """
+        self.body = body
+        self.gzip_body = gzip.compress(body, mtime=0)
+        self.content_type = content_type
+        self.etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+
+
+def render_html(html):
+    """
+    Replaces the placeholders of an HTML file.
+
+    @html: is the content of the HTML file (string)
+    @return: the rendered HTML file (string)
+    """
+    return html.replace("SERVER_ADDRESS", "http://{}:{}".format(SERVER, SERVER_PORT))
+
+
+def load_static_files(root=STATIC_ROOT):
+    """
+    Renders all files of the public directory. The index.html file is also
+    served at the root path.
+
+    @root: is the path of the public directory
+    @return: a dictionary of URL paths -> static files
+    """
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            extension = os.path.splitext(filename)[1].lower()
+            with open(path, "rb") as file:
+                body = file.read()
+
+            if extension == ".html":
+                body = render_html(body.decode("utf-8")).encode("utf-8")
+
+            url = "/" + os.path.relpath(path, root).replace(os.sep, "/")
+            files[url] = StaticFile(
+                body, STATIC_CONTENT_TYPES.get(extension, "application/octet-stream")
+            )
+
+    if "/index.html" in files:
+        files["/"] = files["/index.html"]
+
+    return files
+
+
+def load_status_pages(root=STATIC_ROOT):
+    """
+    Renders the index.html file with the status of a submitted form.
+
+    @root: is the path of the public directory
+    @return: a dictionary of success (boolean) -> static files
+    """
+    with open(os.path.join(root, "index.html"), "rb") as file:
+        html = render_html(file.read().decode("utf-8")).replace(
+            "form { height: 470px; }", "form { height: 520px; }"
+        )
+
+    return {
+        success: StaticFile(
+            html.replace(
+                '<div class="output"></div>',
+                '<div class="output"><div>Status:</div><div id="status">{}</div></div>'.format(
+                    status
+                ),
+            ).encode("utf-8"),
+            STATIC_CONTENT_TYPES[".html"],
+        )
+        for success, status in ((True, STATUS_SUCCESS), (False, STATUS_FAILURE))
+    }
+
+
+# Render the pages at startup
+static_files = load_static_files()
+status_pages = load_status_pages()
+
+
+def ingest_daily_report(ad_network, date):
+    """
+    Runs the daily report of an ingestion job.
+
+    @ad_network: is the name of the ad network
+    @date: is the date of the report
+    @return: a data frame of the saved daily report (serialized when the job
+    is requested)
+    """
+    data = daily_report(ad_network, date, logger_app, True, True)
+    if data is None:
+        raise ValueError("Daily report was not saved")
+
+    return data
+
+
+def accepts_gzip(headers):
+    """
+    Checks if the client accepts gzip compressed responses.
+
+    @headers: are the headers of the request
+    @return: True if gzip is accepted, False otherwise
+    """
+    encodings = headers.get("Accept-Encoding", "").split(",")
+    return "gzip" in [value.split(";")[0].strip().lower() for value in encodings]
+
+
+def job_status(job):
+    """
+    Removes the result from the status of a job.
+
+    @job: is a dictionary with the status of the job
+    @return: a dictionary which can be converted to JSON
+    """
+    return {key: value for key, value in job.items() if key != "result"}
+
+
+def read_batch(body):
+    """
+    Reads the items of a batch request. An item is an object with the
+    ad_network and date keys or a pair [ad_network, date].
+
+    @body: is the body of the request (bytes)
+    @return: a list of (ad_network, date) tuples
+    """
+    items = json.loads(body.decode("utf-8"))
+    if not isinstance(items, list) or not items:
+        raise ValueError("Batch must be a non-empty list")
+
+    batch = []
+    for item in items:
+        if isinstance(item, dict):
+            item = (item["ad_network"], item["date"])
+        ad_network, date = item
+        if not isinstance(ad_network, str) or not isinstance(date, str):
+            raise ValueError("Ad Network and date must be strings")
+        batch.append((ad_network, date))
+
+    return batch
+
+
+def batch_result(job):
+    """
+    Summarizes a finished job of a batch request.
+
+    @job: is a dictionary with the status of the job
+    @return: a dictionary with the status, number of rows and timings of the job
+    """
+    started_at = job["started_at"] or job["created_at"]
+    finished_at = job["finished_at"] or started_at
+
+    return {
+        "id": job["id"],
+        "ad_network": job["arguments"]["ad_network"],
+        "date": job["arguments"]["date"],
+        "status": job["status"],
+        "rows": 0 if job["result"] is None else len(job["result"]),
+        "error": job["error"],
+        "queue_time": round(started_at - job["created_at"], 3),
+        "run_time": round(finished_at - started_at, 3),
+    }
 
 
 class Server(BaseHTTPRequestHandler):
-    def _set_response(self):
+    # HTTP/1.1 is needed for keep-alive and chunked responses
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are closed, so they don't pin their threads
+    timeout = SERVER_KEEPALIVE_TIMEOUT
+
+    def _send_file(self, file, conditional=True, head=False):
         """
-        Sets the response to the request and returns the filename of HTML file.
+        Sends a static file. The gzip compressed body is sent if the client
+        accepts it. If conditional is True and the client already has the
+        current version of the file (If-None-Match), only 304 Not Modified is
+        sent.
         """
-        # Combine a absolute path for the file
-        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public")
-        filename = root + "/index.html"
+        compressed = accepts_gzip(self.headers)
+        body = file.gzip_body if compressed else file.body
+        etag = file.etag[:-1] + '-gzip"' if compressed else file.etag
+
+        # Check if the client has the current version of the file
+        if conditional:
+            etags = [
+                value.strip().replace("W/", "", 1)
+                for value in self.headers.get("If-None-Match", "").split(",")
+            ]
+            if etag in etags or "*" in etags:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", STATIC_CACHE_CONTROL)
+                self.send_header("Vary", "Accept-Encoding")
+                self.end_headers()
+                return
 
         self.send_response(200)  # send response code
-        if filename[-4:] == ".css":
-            # Check if the file is a CSS file
-            self.send_header("Content-type", "text/css")
-        elif filename[-5:] == ".json":
-            # Check if the file is a JSON file
-            self.send_header("Content-type", "application/json")
-        elif filename[-3:] == ".js":
-            # Check if the file is a JS file
-            self.send_header("Content-type", "application/javascript")
-        elif filename[-4:] == ".ico":
-            # Check if the file is an ICO file
-            self.send_header("Content-type", "image/x-icon")
+        self.send_header("Content-type", file.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        if conditional:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", STATIC_CACHE_CONTROL)
         else:
-            # Check if the file is a HTML file
-            self.send_header("Content-type", "text/html")
+            self.send_header("Cache-Control", "no-store")
         self.end_headers()
 
-        return filename
+        if not head:
+            self.wfile.write(body)
 
-    def do_GET(self):
+        return
+
+    def _send_static(self, path, head=False):
+        """
+        Sends the static file of the path or 404 Not Found.
+        """
+        file = static_files.get(path)
+        if file is None:
+            return self._send_json(404, {"error": "Not Found"})
+
+        return self._send_file(file, head=head)
+
+    def _send_json(self, status, data):
+        """
+        Sends the data as a JSON response with the given status code.
+        """
+        body = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)  # send response code
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        return
+
+    def _send_redirect(self, location):
+        """
+        Redirects the client to the location with 303 See Other.
+        """
+        self.send_response(303)  # send response code
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+        return
+
+    def _get_metrics(self):
+        """
+        Returns the metrics of the server in the Prometheus text format.
         """
-        Returns the HTML file.
+        body = render_metrics().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-type", METRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        return
+
+    def _get_report(self, query):
+        """
+        Returns the aggregated daily reports which match the query parameters
+        (start_date, end_date, ad_network, app, platform, group_by).
+        """
+        parameters = {key: value[-1] for key, value in parse_qs(query).items()}
+
+        # Check if the dates are valid
+        for key in ["start_date", "end_date"]:
+            if key in parameters and not parse_date(
+                parameters[key], DATE_FORMAT, False
+            ):
+                return self._send_json(400, {"error": "Invalid {}".format(key)})
+
+        # Check if the group by options are valid
+        group_by = tuple(
+            option for option in parameters.get("group_by", "").split(",") if option
+        )
+        if any(option not in REPORT_GROUP_BY for option in group_by):
+            return self._send_json(400, {"error": "Invalid group_by"})
+
+        data = read_report(
+            parameters.get("start_date"),
+            parameters.get("end_date"),
+            parameters.get("ad_network"),
+            parameters.get("app"),
+            parameters.get("platform"),
+            group_by,
+        )
+        if data is None:
+            return self._send_json(500, {"error": "Error"})
+
+        # The report can also be returned as compact columnar JSON or CSV
+        content_type = negotiate_format(self.headers.get("Accept"))
+        if content_type != FORMAT_JSON:
+            return self._send_stream(
+                200,
+                content_type,
+                serialize_data_frame(pd.DataFrame(data), content_type),
+            )
+
+        return self._send_json(200, {"data": data})
+
+    def _start_stream(self, status, content_type, compressed=False):
+        """
+        Sends the headers of a streamed response. HTTP/1.1 clients receive the
+        body in chunks (chunked transfer encoding), HTTP/1.0 clients until the
+        connection is closed.
+
+        @return: True if the body is chunked, False otherwise
+        """
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(status)  # send response code
+        self.send_header("Content-type", content_type)
+        self.send_header("Vary", "Accept-Encoding")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+        return chunked
+
+    def _write_bytes(self, body, chunked):
+        """
+        Writes bytes as a chunk of the response.
+        """
+        if not body:
+            return
+
+        if chunked:
+            body = b"%X\r\n%s\r\n" % (len(body), body)
+        self.wfile.write(body)
+        self.wfile.flush()
+
+        return
+
+    def _write_chunk(self, data, chunked):
+        """
+        Writes a line of JSON as a chunk of the response.
+        """
+        return self._write_bytes(json.dumps(data).encode("utf-8") + b"\n", chunked)
+
+    def _send_stream(self, status, content_type, chunks):
+        """
+        Streams the chunks (strings) of a serialized response, gzip compressed
+        if the client accepts it.
+        """
+        compressed = accepts_gzip(self.headers)
+        body = (chunk.encode("utf-8") for chunk in chunks)
+        if compressed:
+            body = gzip_chunks(body)
+
+        try:
+            chunked = self._start_stream(status, content_type, compressed)
+            for chunk in body:
+                self._write_bytes(chunk, chunked)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger_app.info("Client disconnected")
+            self.close_connection = True
+
+        return
+
+    def _get_job(self, job_id):
         """
-        # Set the response
-        filename = self._set_response()
+        Returns the status of a job. The report of a finished job is streamed
+        in the format chosen by the Accept header: inside the JSON status (JSON
+        table format) or alone as compact columnar JSON or CSV.
+        """
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            return self._send_json(404, {"error": "Job does not exist"})
+
+        data = job["result"]
+        if data is None:
+            return self._send_json(200, job_status(job))
 
-        with open(filename, "rb") as file:
-            # Read the file and replace the address
-            html_file = (
-                file.read()
-                .decode("utf-8")
-                .replace("SERVER_ADDRESS", "http://{}:{}".format(SERVER, SERVER_PORT))
-                .encode("utf-8")
+        content_type = negotiate_format(self.headers.get("Accept"))
+        if content_type != FORMAT_JSON:
+            return self._send_stream(
+                200, content_type, serialize_data_frame(data, content_type)
             )
-            self.wfile.write(html_file)
+
+        # Insert the report into the JSON status of the job
+        status = json.dumps(job_status(job))
+        return self._send_stream(
+            200,
+            FORMAT_JSON,
+            chain([status[:-1] + ', "result": '], serialize_table(data), ["}"]),
+        )
+
+    def _post_batch(self, body):
+        """
+        Runs the daily reports of a batch in the job queue and streams a line of
+        JSON (NDJSON) for every item as soon as it is finished, followed by a
+        summary line. Items are submitted while the queue has room and the rest
+        as the submitted jobs are finished, so a batch can be larger than the
+        queue.
+        """
+        try:
+            batch = read_batch(body)
+        except:
+            return self._send_json(400, {"error": "Error"})
+
+        start = time.perf_counter()
+        chunked = self._start_stream(200, "application/x-ndjson")
+
+        summary = {"total": len(batch), JOB_SUCCEEDED: 0, JOB_FAILED: 0}
+        try:
+            pending = list(reversed(batch))
+            job_ids = []
+            while pending or job_ids:
+                # Submit the next items while the queue has room
+                while pending:
+                    ad_network, date = pending[-1]
+                    job_id = self.server.jobs.submit(ad_network=ad_network, date=date)
+                    if job_id is None:
+                        break
+                    pending.pop()
+                    job_ids.append(job_id)
+
+                # The queue is full of the jobs of other requests
+                if not job_ids:
+                    self.server.jobs.wait_any(BATCH_SUBMIT_INTERVAL)
+                    continue
+
+                # Report the item which is finished first, which makes room for
+                # the next one
+                job = next(self.server.jobs.as_completed(job_ids), None)
+                if job is None:
+                    # The statuses of the jobs were already forgotten
+                    job_ids = []
+                    continue
+
+                job_ids.remove(job["id"])
+                summary[job["status"]] += 1
+                self._write_chunk(batch_result(job), chunked)
+
+            summary["time"] = round(time.perf_counter() - start, 3)
+            self._write_chunk({"summary": summary}, chunked)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client is gone, the submitted jobs are still finished
+            logger_app.info("Batch client disconnected")
+            self.close_connection = True
 
         return
 
+    def do_GET(self):
+        """
+        Returns the aggregated daily reports, the status of a job, the metrics
+        or a static file.
+        """
+        url = urlsplit(self.path)
+        if url.path == "/api/report":
+            return self._get_report(url.query)
+
+        if url.path == "/metrics":
+            return self._get_metrics()
+
+        if url.path.startswith("/api/jobs/"):
+            return self._get_job(url.path[len("/api/jobs/") :])
+
+        return self._send_static(url.path)
+
+    def do_HEAD(self):
+        """
+        Returns the headers of a static file.
+        """
+        return self._send_static(urlsplit(self.path).path, head=True)
+
     def do_POST(self):
         """
         Handles the POST request and returns the HTML file.
@@ -81,66 +552,45 @@ class Server(BaseHTTPRequestHandler):
         )  # get the length of the data
         post_data = self.rfile.read(content_length)  # get data
 
-        # Check if it is a api request or a html request
-        if self.path == "/api":
-            # Api request
-            self.send_response(200)  # send response code
-            self.send_header("Content-type", "application/json")  # send header
-            self.end_headers()
-
-            post_data = json.loads(post_data.decode("utf-8"))
+        # Check if it is a batch, api or html request
+        if self.path == "/api/batch":
+            return self._post_batch(post_data)
 
+        if self.path == "/api":
+            # Api request (the daily report is run by a worker of the job queue)
             try:
-                # Call the daily report function
-                data = daily_report(
-                    post_data["ad_network"], post_data["date"], logger_app, True, True
+                post_data = json.loads(post_data.decode("utf-8"))
+                job_id = self.server.jobs.submit(
+                    ad_network=post_data["ad_network"], date=post_data["date"]
                 )
-                # Convert data to json
-                data = data.to_json(orient="table")
             except:
-                # If the function fails, return an error json
-                data = json.dumps({"error": "Error"})
+                # If the request is not valid, return an error json
+                return self._send_json(400, {"error": "Error"})
+
+            if job_id is None:
+                return self._send_json(503, {"error": "Job queue is full"})
 
-            # Return the data
-            self.wfile.write(data.encode("utf-8"))
+            return self._send_json(202, job_status(self.server.jobs.get(job_id)))
 
         else:
             # HTML request
             post_data = post_data.decode("utf-8").split("&")
 
-            # Cal the daily report function
-            data = daily_report(
-                post_data[0].split("=")[-1],
-                post_data[1].split("=")[-1],
-                logger_app,
-                True,
-                True,
+            # Run the daily report in the job queue and wait for it
+            job_id = self.server.jobs.submit(
+                ad_network=post_data[0].split("=")[-1],
+                date=post_data[1].split("=")[-1],
             )
+            job = self.server.jobs.wait(job_id, SERVER_JOB_TIMEOUT) if job_id else None
 
-            response_status = '<i class="fa-solid fa-xmark"></i>'
-            if data is not None and len(data):
-                response_status = '<i class="fa-solid fa-check"></i>'
-
-            # Set the response
-            filename = self._set_response()
-            with open(filename, "rb") as file:
-                # Read the file and replace the address
-                html_file = (
-                    file.read()
-                    .decode("utf-8")
-                    .replace(
-                        "SERVER_ADDRESS", "http://{}:{}".format(SERVER, SERVER_PORT)
-                    )
-                    .replace("form { height: 470px; }", "form { height: 520px; }")
-                    .replace(
-                        '<div class="output"></div>',
-                        '<div class="output"><div>Status:</div><div id="status">{}</div></div>'.format(
-                            response_status
-                        ),
-                    )
-                    .encode("utf-8")
-                )
-                self.wfile.write(html_file)
+            # Redirect to the status of a job which is not finished in time
+            if job is not None and job["status"] not in (JOB_SUCCEEDED, JOB_FAILED):
+                return self._send_redirect("/api/jobs/{}".format(job_id))
+
+            success = job is not None and job["status"] == JOB_SUCCEEDED
+
+            # Send the rendered page with the status
+            self._send_file(status_pages[success], conditional=False)
 
         return
 
@@ -149,8 +599,12 @@ if __name__ == "__main__":
     # Create an object of the Server class
     Handler = Server
 
-    # Create a server
-    server = socketserver.TCPServer((SERVER, SERVER_PORT), Handler)
+    # Create a server (each request is handled in its own thread)
+    server = socketserver.ThreadingTCPServer((SERVER, SERVER_PORT), Handler)
+    server.daemon_threads = True
+
+    # Create a pool of workers which run the daily reports
+    server.jobs = JobQueue(ingest_daily_report)
     logger_app.info("Server started http://%s:%s" % (SERVER, SERVER_PORT))
 
     try:
@@ -2,7 +2,20 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
+import io
+import sys
+import gzip
+import contextlib
+import json
+import logging
+import tempfile
+import time
+import http.client
+import socketserver
+import threading
 import unittest
+from unittest import mock
+from http.server import HTTPServer, BaseHTTPRequestHandler
 import pandas as pd
 from utils.currency_enum import Currency
 from utils.currency_const import (
@@ -14,22 +27,77 @@ from utils.currency_const import (
 
 
 # Import testing files
+import utils.currency
 from utils.currency import (
     save_currency,
     update_currency,
+    update_currencies,
     read_currency,
+    fetch_exchange_rates,
     get_exchange_rate_usd,
     CURRENCY_TABLE_NAME,
 )
-from utils.database import database_connect, database_execute
-from utils.date import is_date, convert_date, convert_date_data_frame
-from utils.logger import get_logger
+from utils.cache import TTLCache, ttl_cache
+from utils.database import (
+    DatabasePool,
+    database_connect,
+    database_execute,
+    database_pool,
+    database_transaction,
+    database_autocommit,
+)
+from utils.date import is_date, parse_date, convert_date, convert_date_data_frame
+from utils.logger import get_logger, JsonFormatter, RateLimitFilter
+from utils.http_session import get_session, read_validators, save_validators
 from utils.revenue import update_revenue, convert_revenue
+from utils.report_cache import ReportCache
+from utils.lazy_import import lazy_import
+from utils.schema import compact_chunk, concat_chunks
+from utils.metrics import Counter, Histogram, render_metrics, metrics_database_seconds
+from utils.serialize import (
+    negotiate_format,
+    serialize_table,
+    serialize_columnar,
+    serialize_csv,
+    gzip_chunks,
+    FORMAT_JSON,
+    FORMAT_CSV,
+)
+from backfill import backfill, date_range, read_jobs
+from main import read_stdin_jobs
+from benchmark import (
+    measure_import_time,
+    measure_peak_memory,
+    generate_report_csv,
+    serve_reports,
+    IMPORT_TIME_MODULES,
+    IMPORT_TIME_BUDGET,
+    MEMORY_BUDGET,
+    MEMORY_BUDGET_ROWS,
+)
+from jobs import JobQueue, JOB_SUCCEEDED, JOB_FAILED
+import server
+from server import StaticFile, load_static_files, status_pages, read_batch
+from analyze import (
+    analyze_report,
+    rule_app_platform,
+    DEFAULT_COLUMNS,
+    DEFAULT_DATE_FORMAT,
+)
+from dimension import save_app, read_app, read_platform, APP_TABLE_NAME
 from ad_network import save_ad_network, read_ad_network, AD_NETWORK_TABLE_NAME
 from daily_report import (
+    copy_daily_report,
     save_daily_report,
     read_daily_report,
+    read_cached_report,
+    cluster_daily_report,
     daily_report,
+    read_report,
+    invalidate_report,
+    create_daily_report_partitions,
+    read_missing_partitions,
+    DAILY_REPORT_KEY,
     DAILY_REPORT_TABLE_NAME,
 )
 
@@ -40,6 +108,345 @@ logger_test.setLevel("CRITICAL")  # don't log anything
 
 
 class Test(unittest.TestCase):
+    # Tests the analyze methods
+    def test_analyze(self):
+        # Test the rule_app_platform
+        data = pd.DataFrame(
+            [["Talking Ginger", "iOS"], ["Talking Ginger", "PC"], ["App", "iOS"]],
+            columns=["App", "Platform"],
+        )
+        mask = rule_app_platform(data, None, ["Talking Ginger"], ["iOS"])
+        self.assertEqual(mask.tolist(), [False, True, True])
+
+        mask = rule_app_platform(data[:1], None, ["Talking Ginger"], ["iOS"])
+        self.assertFalse(mask.any())
+
+        # Test the analyze_report
+        data = pd.DataFrame(
+            [
+                ["15/09/2017", "Talking Ginger", "iOS", "10", "5", "1.5"],
+                ["15/09/2017", "Talking Ginger", "iOS", "x", "5", "1.5"],
+                ["15/09/2017", "Talking Ginger", "iOS", "1", "5", "1.5"],
+            ],
+            columns=["Date", "App", "Platform", "Requests", "Impressions", "Revenue"],
+        )
+        result, flag, report = analyze_report(data)
+        self.assertFalse(flag)
+        self.assertEqual(
+            result.values.tolist(),
+            [["15/09/2017", "Talking Ginger", "iOS", 10, 5, "1.5"]],
+        )
+        report = {rule["rule"]: rule["failed"] for rule in report}
+        self.assertEqual(report["requests_numeric"], 1)
+        self.assertEqual(report["impressions_requests"], 1)
+        self.assertEqual(report["date_format"], 0)
+
+        return
+
+    # Tests the dimension methods
+    def test_dimension(self):
+        # Test the save_app
+        self.assertTrue(save_app(("Test App",), False))
+
+        # Test the read_app and read_platform
+        self.assertIn("Test App", read_app())
+        self.assertTrue(len(read_platform()))
+
+        return
+
+    # Tests the metrics
+    def test_metrics(self):
+        registry = []
+        counter = Counter("test_rows_total", "Rows.", ("ad_network",), registry)
+        counter.inc(ad_network="SuperNetwork")
+        counter.inc(2, ad_network="SuperNetwork")
+        self.assertEqual(counter.get(ad_network="SuperNetwork"), 3)
+        self.assertRaises(ValueError, counter.inc, app="My Talking Tom")
+
+        histogram = Histogram("test_seconds", "Time.", (), (0.1, 1), registry)
+        histogram.observe(0.05)
+        histogram.observe(5)
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.get()[0], 3)
+        self.assertEqual(
+            render_metrics(registry),
+            "# HELP test_rows_total Rows.\n"
+            "# TYPE test_rows_total counter\n"
+            'test_rows_total{ad_network="SuperNetwork"} 3\n'
+            "# HELP test_seconds Time.\n"
+            "# TYPE test_seconds histogram\n"
+            'test_seconds_bucket{le="0.1"} 2\n'
+            'test_seconds_bucket{le="1"} 2\n'
+            'test_seconds_bucket{le="+Inf"} 3\n'
+            "test_seconds_sum " + repr(histogram.get()[1]) + "\n"
+            "test_seconds_count 3\n",
+        )
+
+        # Database queries are measured by their statement
+        count, _ = metrics_database_seconds.get(statement="SELECT")
+        database_execute((), "SELECT 1", logger_test, "Select")
+        self.assertEqual(metrics_database_seconds.get(statement="SELECT")[0], count + 1)
+        self.assertIn("apps7_stage_seconds", render_metrics())
+
+        return
+
+    # Tests the cache methods
+    def test_cache(self):
+        # Test the TTLCache
+        cache = TTLCache(60)
+        self.assertEqual(cache.get("key"), (False, None))
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), (True, "value"))
+        cache.invalidate("key")
+        self.assertEqual(cache.get("key"), (False, None))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "size": 0})
+
+        # Test the ttl_cache
+        calls = []
+
+        @ttl_cache(60)
+        def function(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual(function(1), 1)
+        self.assertEqual(function(1), 1)
+        self.assertEqual(calls, [1])
+        function.cache.invalidate()
+        self.assertEqual(function(1), 1)
+        self.assertEqual(calls, [1, 1])
+
+        # Test the LRU eviction and the invalidation by predicate
+        cache = TTLCache(60, 2)
+        cache.set(1, 1)
+        cache.set(2, 2)
+        cache.get(1)
+        cache.set(3, 3)
+        self.assertEqual(cache.get(2), (False, None))
+        cache.invalidate_where(lambda key: key == 1)
+        self.assertEqual(cache.get(1), (False, None))
+        self.assertEqual(cache.get(3), (True, 3))
+
+        # Test that a result computed during an invalidation is not cached
+        @ttl_cache(60)
+        def function(value):
+            function.cache.invalidate_where(lambda key: True)
+            return value
+
+        self.assertEqual(function(1), 1)
+        self.assertEqual(function.cache.get((1,)), (False, None))
+
+        return
+
+    # Tests the static files of the server
+    def test_server(self):
+        files = load_static_files()
+        self.assertIs(files["/"], files["/index.html"])
+        self.assertNotIn(b"SERVER_ADDRESS", files["/"].body)
+        self.assertTrue(files["/"].content_type.startswith("text/html"))
+        self.assertIn(b"fa-check", status_pages[True].body)
+        self.assertIn(b"fa-xmark", status_pages[False].body)
+
+        # Test the StaticFile
+        file = StaticFile(b"body", "text/plain")
+        self.assertEqual(gzip.decompress(file.gzip_body), b"body")
+        self.assertEqual(file.etag, StaticFile(b"body", "text/plain").etag)
+        self.assertNotEqual(file.etag, StaticFile(b"other", "text/plain").etag)
+
+        # Test the read_batch
+        self.assertEqual(
+            read_batch(
+                b'[["SuperNetwork", "2017-09-15"], '
+                b'{"ad_network": "AdUmbrella", "date": "2017-09-15"}]'
+            ),
+            [("SuperNetwork", "2017-09-15"), ("AdUmbrella", "2017-09-15")],
+        )
+        self.assertRaises(ValueError, read_batch, b"[]")
+        self.assertRaises(ValueError, read_batch, b'[["SuperNetwork"]]')
+
+        # Test that a form whose job is not finished in time is redirected to the
+        # status of the job
+        release = threading.Event()
+        http_server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), server.Server)
+        http_server.daemon_threads = True
+        http_server.jobs = JobQueue(lambda **arguments: release.wait() and [1], 1, 1)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        try:
+            with mock.patch("server.SERVER_JOB_TIMEOUT", 0.1):
+                connection = http.client.HTTPConnection(*http_server.server_address)
+                connection.request("POST", "/", b"ad_network=A&date=2017-09-15")
+                response = connection.getresponse()
+                response.read()
+                self.assertEqual(response.status, 303)
+                self.assertTrue(response.getheader("Location").startswith("/api/"))
+            release.set()
+
+            # Test that a batch larger than the job queue is submitted as the
+            # jobs are finished
+            http_server.jobs = JobQueue(
+                lambda **arguments: time.sleep(0.05) or [1], 1, 1
+            )
+            connection.request("POST", "/api/batch", json.dumps([["A", "1"]] * 5))
+            lines = connection.getresponse().read().decode("utf-8").splitlines()
+            summary = json.loads(lines[-1])["summary"]
+            self.assertEqual((summary["total"], summary["succeeded"]), (5, 5))
+            connection.close()
+
+            # Test that an idle keep-alive connection is closed
+            self.assertEqual(server.Server.timeout, server.SERVER_KEEPALIVE_TIMEOUT)
+            with mock.patch.object(server.Server, "timeout", 0.1):
+                connection = http.client.HTTPConnection(*http_server.server_address)
+                connection.connect()
+                connection.sock.settimeout(5)
+                self.assertEqual(connection.sock.recv(1), b"")
+                connection.close()
+        finally:
+            release.set()
+            http_server.shutdown()
+            http_server.server_close()
+
+        return
+
+    # Tests the lazy imports and the cold import time of the applications
+    def test_import_time(self):
+        module = lazy_import("this")  # prints the Zen of Python when imported
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(module.__name__, "this")
+            self.assertEqual(output.getvalue(), "")
+            self.assertTrue(module.s)
+            self.assertIn("Beautiful", output.getvalue())
+        self.assertIs(lazy_import("json"), json)
+
+        for module in IMPORT_TIME_MODULES:
+            self.assertLess(measure_import_time(module), IMPORT_TIME_BUDGET, module)
+
+        return
+
+    # Tests the synthetic reports and the local report host of the benchmarks
+    def test_benchmark(self):
+        report = generate_report_csv(100, currency="GBP", bad_dates=0.5)
+        self.assertEqual(report, generate_report_csv(100, "GBP", bad_dates=0.5))
+        self.assertTrue(report.startswith(b"Date,App,Platform,"))
+        self.assertIn(b"Revenue (gbp)", report)
+        self.assertIn(b"2017-09-15,", report)
+        self.assertIn(b"\nTotals,", report)
+        self.assertNotIn(b"Totals", generate_report_csv(100, totals=False))
+
+        with serve_reports({"/report.csv": report}) as url:
+            data = read_daily_report(url + "/report.csv")
+            self.assertIsNone(read_daily_report(url + "/missing.csv"))
+        self.assertEqual(len(data), 101)
+        self.assertEqual(data.iloc[-1]["Date"], "Totals")
+
+        return
+
+    # Tests the compact schema of the reports and the peak memory of processing
+    def test_schema(self):
+        chunks = [
+            compact_chunk(
+                pd.DataFrame(
+                    [["15/09/2017", "My Talking Tom", "iOS", "10", "5", revenue]],
+                    columns=DEFAULT_COLUMNS,
+                )
+            )
+            for revenue in ["0.00001", "$2.5", "1.5"]
+        ]
+        self.assertEqual(str(chunks[0]["App"].dtype), "category")
+        self.assertEqual(str(chunks[0]["Requests"].dtype), "int32")
+        data = concat_chunks(chunks)
+        self.assertEqual(str(data["App"].dtype), "category")
+        self.assertEqual(list(data["Revenue"]), ["0.00001", "$2.5", "1.5"])
+        data = concat_chunks([chunks[0], chunks[2]])
+        self.assertEqual(list(data["Revenue"]), [0.00001, 1.5])
+        self.assertTrue(
+            compact_chunk(pd.DataFrame([["", "", "", "x", "5", "1"]]))[3].isna().all()
+        )
+
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            file.write(generate_report_csv(MEMORY_BUDGET_ROWS))
+            file.flush()
+            result = measure_peak_memory(file.name)
+        self.assertEqual(result["rows"], MEMORY_BUDGET_ROWS + 1)  # with Totals
+        self.assertLess(result["peak"], MEMORY_BUDGET)
+
+        return
+
+    # Tests the serialization of responses
+    def test_serialize(self):
+        data = pd.DataFrame(
+            [
+                ["2017-09-15", "Talking Ginger", 10, 1.5],
+                ["2017-09-15", "A, B", 5, None],
+            ],
+            columns=["Date", "App", "Requests", "Revenue"],
+        )
+
+        # Test the negotiate_format
+        self.assertEqual(negotiate_format(None), FORMAT_JSON)
+        self.assertEqual(negotiate_format("*/*"), FORMAT_JSON)
+        self.assertEqual(
+            negotiate_format("application/json;q=0.5, text/csv"), FORMAT_CSV
+        )
+
+        # Test the serialize_table (same JSON as pandas, in chunks)
+        self.assertEqual(
+            "".join(serialize_table(data, 1)), data.to_json(orient="table")
+        )
+        self.assertEqual(
+            "".join(serialize_table(data[:0])), data[:0].to_json(orient="table")
+        )
+
+        # Test the serialize_columnar
+        result = json.loads("".join(serialize_columnar(data)))
+        self.assertEqual(result["columns"], list(data.columns))
+        self.assertEqual(result["data"][1], ["Talking Ginger", "A, B"])
+
+        # Test the serialize_csv
+        self.assertEqual("".join(serialize_csv(data, 1)), data.to_csv(index=False))
+
+        # Test the gzip_chunks
+        self.assertEqual(gzip.decompress(b"".join(gzip_chunks([b"a", b"b"]))), b"ab")
+
+        return
+
+    # Tests the job queue
+    def test_jobs(self):
+        def function(value):
+            if value is None:
+                raise ValueError("Value is missing")
+            return value
+
+        jobs = JobQueue(function, workers=2, max_size=10, history_size=1)
+        job_id = jobs.submit(value=1)
+        result = jobs.wait(job_id, 10)
+        self.assertEqual(result["status"], JOB_SUCCEEDED)
+        self.assertEqual(result["result"], 1)
+
+        result = jobs.wait(jobs.submit(value=None), 10)
+        self.assertEqual(result["status"], JOB_FAILED)
+        self.assertEqual(result["error"], "Value is missing")
+
+        # Only the last finished job is kept
+        self.assertIsNone(jobs.get(job_id))
+        self.assertIsNone(jobs.get("..."))
+
+        # Test the as_completed (jobs are yielded when they are finished)
+        event = threading.Event()
+        jobs = JobQueue(lambda value: event.wait(10) and value, workers=2)
+        job_ids = [jobs.submit(value=1), jobs.submit(value=2)]
+        results = jobs.as_completed(job_ids)
+        event.set()
+        self.assertEqual(sorted(result["result"] for result in results), [1, 2])
+        self.assertEqual(len(list(jobs.as_completed(job_ids, 0))), 2)
+
+        # A full queue rejects new jobs
+        jobs = JobQueue(function, workers=0, max_size=1)
+        self.assertIsNotNone(jobs.submit(value=1))
+        self.assertIsNone(jobs.submit(value=2))
+
+        return
+
     # Tests the currency methods
     def test_currency(self):
         # Test the save_currency
@@ -80,6 +487,54 @@ class Test(unittest.TestCase):
         self.assertAlmostEqual(exchange_rate, DEFAULT_HKD_USD, places=1)
         self.assertNotEqual(exchange_rate, 1)
 
+        # Test the update_currencies
+        self.assertTrue(update_currencies({Currency.USD: 1}))
+        self.assertFalse(update_currencies({}))
+
+        return
+
+    # Tests the exchange rates refresh against a local stub of the APILayer API
+    def test_exchange_rates(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(
+                    {"base": "USD", "rates": {"EUR": 0.5, "GBP": 0.8, "CNY": 8}}
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        api_url = utils.currency.APILAYER_API_URL
+        utils.currency.APILAYER_API_URL = (
+            "http://127.0.0.1:{}/latest?base={{}}&symbols={{}}".format(
+                server.server_address[1]
+            )
+        )
+        try:
+            # Test the fetch_exchange_rates
+            rates = fetch_exchange_rates(logger_test)
+            self.assertEqual(
+                rates,
+                {
+                    Currency.USD: 1.0,
+                    Currency.EUR: 2.0,
+                    Currency.GBP: 1.25,
+                    Currency.CNY: 0.125,
+                },
+            )
+        finally:
+            utils.currency.APILAYER_API_URL = api_url
+            server.shutdown()
+            server.server_close()
+
         return
 
     # Tests the database methods
@@ -114,6 +569,83 @@ class Test(unittest.TestCase):
         )
         self.assertFalse(result)
 
+        # Test the database_transaction
+        with database_transaction() as connection:
+            self.assertIsNotNone(connection)
+            query = "SELECT * FROM test"
+            result = database_execute(
+                (), query, logger_test, "Test database execution", False
+            )
+            self.assertEqual(list(result), data[0])
+        self.assertEqual(database_pool.stats()["used"], 0)
+
+        # Test the database_autocommit (a failed query doesn't abort the
+        # transaction of the thread)
+        with database_transaction():
+            with database_autocommit():
+                result = database_execute(
+                    (), "SELECT * FROM missing", logger_test, "Test", False
+                )
+            self.assertFalse(result)
+            result = database_execute(
+                (), "SELECT * FROM test", logger_test, "Test database execution"
+            )
+            self.assertEqual(list(result), data[0])
+
+        return
+
+    # Tests the connection pool (without a database)
+    def test_database_pool(self):
+        checking = threading.Event()
+        release = threading.Event()
+
+        class Connection:
+            closed = False
+            slow = False
+
+            def cursor(self):
+                return self
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, query):
+                if self.slow:
+                    checking.set()
+                    release.wait(5)
+
+            def close(self):
+                self.closed = True
+
+        pool = DatabasePool(0, 2, 1800, 300, 5, connect=Connection)
+        connection = pool.get()
+        connection.slow = True
+        pool.put(connection)
+
+        # Test that the health check of an idle connection doesn't lock the pool
+        result = []
+        with mock.patch("utils.database.DATABASE_POOL_HEALTH_CHECK_INTERVAL", 0):
+            thread = threading.Thread(target=lambda: result.append(pool.get()))
+            thread.start()
+            self.assertTrue(checking.wait(5))
+            start = time.monotonic()
+            other = pool.get()
+            self.assertLess(time.monotonic() - start, 1)
+            release.set()
+            thread.join()
+        self.assertIs(result[0], connection)
+        self.assertIsNot(other, connection)
+        self.assertEqual(pool.stats(), {"size": 2, "idle": 0, "used": 2})
+
+        # Test that an unhealthy idle connection is replaced
+        pool.put(other)
+        other.closed = True
+        self.assertIsNot(pool.get(), other)
+        self.assertEqual(pool.stats()["size"], 2)
+
         return
 
     # Tests the date methods
@@ -125,6 +657,13 @@ class Test(unittest.TestCase):
         # Test the convert_date
         self.assertEqual(convert_date("01/01/2022", "%Y-%m-%d"), "2022-01-01")
         self.assertIsNone(convert_date("date", "%Y-%m-%d"))
+        self.assertEqual(
+            convert_date("5_9_2017", "%Y-%m-%d", "%-d_%-m_%Y"), "2017-09-05"
+        )
+
+        # Test the parse_date
+        self.assertIsNone(parse_date("2017-09-15", "%d/%m/%Y", fallback=False))
+        self.assertIsNotNone(parse_date("15/09/2017", "%d/%m/%Y", fallback=False))
 
         # Test tje convert_date_data_frame
         data = convert_date_data_frame(
@@ -135,6 +674,32 @@ class Test(unittest.TestCase):
             ["2022-01-01", "2022-01-01", "2022-01-01"],
         )
 
+        # Test that the dates of report rows (DD/MM/YYYY) are parsed without
+        # dateutil when the format of the rows is the hint
+        parse_date.cache_clear()
+        with mock.patch("utils.date.dateutil_parser") as dateutil_parser:
+            dateutil_parser.parse.side_effect = ValueError
+            data = convert_date_data_frame(
+                pd.DataFrame(["15/09/2017", "16/09/2017"], columns=["Date"]),
+                DEFAULT_DATE_FORMAT,
+            )
+            self.assertFalse(is_date("Totals", DEFAULT_DATE_FORMAT))
+        self.assertEqual(data["Date"].values.tolist(), ["2017-09-15", "2017-09-16"])
+        self.assertEqual(dateutil_parser.parse.call_count, 1)  # only Totals
+        parse_date.cache_clear()
+
+        return
+
+    # Tests the http session methods
+    def test_http_session(self):
+        # Test the get_session
+        self.assertIs(get_session(), get_session())
+
+        # Test the save_validators and read_validators
+        self.assertEqual(read_validators("http://..."), {})
+        save_validators("http://...", {"ETag": '"test"'})
+        self.assertEqual(read_validators("http://..."), {"ETag": '"test"'})
+
         return
 
     # Tests the logger methods
@@ -142,6 +707,59 @@ class Test(unittest.TestCase):
         # Test the get_logger
         logger = get_logger("Test")
         self.assertIsNotNone(logger)
+        self.assertEqual(logger.name, "Test")
+        self.assertIs(get_logger("Test"), logger)
+
+        # Test the RateLimitFilter (warnings of the same call and template are
+        # limited, even if their arguments are different)
+        log_filter = RateLimitFilter(2, 60)
+        records = [
+            logging.makeLogRecord(
+                {"msg": "Warning %s", "args": (index,), "levelno": 30, "lineno": 1}
+            )
+            for index in range(4)
+        ]
+        self.assertEqual(
+            [log_filter.filter(record) for record in records],
+            [True, True, False, False],
+        )
+        record = logging.makeLogRecord({"msg": "Warning", "levelno": 30, "lineno": 1})
+        self.assertTrue(log_filter.filter(record))
+        record = logging.makeLogRecord({"msg": "Warning", "levelno": 30, "lineno": 2})
+        self.assertTrue(log_filter.filter(record))
+        self.assertTrue(log_filter.filter(logging.makeLogRecord({"levelno": 20})))
+
+        # Test the JsonFormatter
+        record = logging.makeLogRecord(
+            {"name": "Test", "msg": "Rows: %s", "args": (7,), "ad_network": "Test"}
+        )
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual(data["message"], "Rows: 7")
+        self.assertEqual(data["logger"], "Test")
+        self.assertEqual(data["ad_network"], "Test")
+
+        return
+
+    # Tests the report cache methods
+    def test_report_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ReportCache(directory, 10)
+
+            # Test the open_writer and save
+            reader = cache.open_writer(io.BytesIO(b"Date,App"))
+            self.assertEqual(reader.read(), b"Date,App")
+            cache.save("AdNetwork", "2017-09-15", reader)
+
+            # Test the open
+            with cache.open("AdNetwork", "2017-09-15") as file:
+                self.assertEqual(file.read(), b"Date,App")
+            self.assertIsNone(cache.open("AdNetwork", "2017-09-16"))
+
+            # Test the eviction of the least recently used report
+            reader = cache.open_writer(io.BytesIO(b"Date,Platform"))
+            reader.read()
+            cache.save("AdNetwork", "2017-09-16", reader)
+            self.assertIsNone(cache.open("AdNetwork", "2017-09-15"))
 
         return
 
@@ -184,6 +802,54 @@ class Test(unittest.TestCase):
             )
         )
 
+        # Test the copy_daily_report
+        self.assertTrue(
+            copy_daily_report(
+                pd.DataFrame(
+                    [["2017-09-15", "Talking Ginger", "iOS", 8934, 248, 1.74, 1, 1]]
+                )
+            )
+        )
+
+        # Test that reimported rows are updated and not duplicated
+        self.assertTrue(
+            save_daily_report(
+                ("2017-09-15", "Talking Ginger", "iOS", 9000, 250, 1.8, 1, 1), False
+            )
+        )
+        result = database_execute(
+            ("2017-09-15", "Talking Ginger", "iOS", 1),
+            "SELECT report_requests FROM {} WHERE report_date = %s AND \
+                report_app = %s AND report_platform = %s AND ad_network_id = %s".format(
+                DAILY_REPORT_TABLE_NAME
+            ),
+            logger_test,
+            "Read daily report",
+            fetch_all=True,
+        )
+        self.assertEqual(result, [(9000,)])
+
+        # Test that reimported rows without an Ad Network are not duplicated
+        for requests in [8934, 9000]:
+            self.assertTrue(
+                save_daily_report(
+                    ("2017-09-15", "Talking Ben", "iOS", requests, 250, 1.8, 1, None),
+                    False,
+                )
+            )
+        result = database_execute(
+            ("2017-09-15", "Talking Ben", "iOS"),
+            "SELECT report_requests FROM {} WHERE report_date = %s AND \
+                report_app = %s AND report_platform = %s AND \
+                ad_network_id IS NULL".format(
+                DAILY_REPORT_TABLE_NAME
+            ),
+            logger_test,
+            "Read daily report",
+            fetch_all=True,
+        )
+        self.assertEqual(result, [(9000,)])
+
         # Test the read_daily_report methods
         self.assertIsNone(read_daily_report("http://..."))
         self.assertIsNotNone(
@@ -192,12 +858,131 @@ class Test(unittest.TestCase):
             )
         )
 
+        # Test the cluster_daily_report (revenue given as strings is summed)
+        data = cluster_daily_report(
+            pd.DataFrame(
+                [
+                    ["2017-09-15", "Talking Ginger", "iOS", "10", "5", "1.5"],
+                    ["2017-09-15", "Talking Ginger", "iOS", "20", "5", "0.25"],
+                    ["2017-09-15", "My Talking Tom", "iOS", "1", "1", "1"],
+                ],
+                columns=["Date", "App", "Platform", "Requests", "Impressions", "Revenue"],
+            )
+        )
+        self.assertEqual(
+            data.values.tolist(),
+            [
+                ["2017-09-15", "Talking Ginger", "iOS", 30, 10, 1.75],
+                ["2017-09-15", "My Talking Tom", "iOS", 1, 1, 1.0],
+            ],
+        )
+
+        # Test the cluster_daily_report (revenue which is not numeric is rejected)
+        data = cluster_daily_report(
+            pd.DataFrame(
+                [
+                    ["2017-09-15", "Talking Ginger", "iOS", "10", "5", "1.5"],
+                    ["2017-09-15", "Talking Ginger", "iOS", "20", "5", "n/a"],
+                ],
+                columns=["Date", "App", "Platform", "Requests", "Impressions", "Revenue"],
+            )
+        )
+        self.assertEqual(
+            data.values.tolist(), [["2017-09-15", "Talking Ginger", "iOS", 10, 5, 1.5]]
+        )
+
+        # Test the create_daily_report_partitions (concurrent workers which
+        # create the same partition don't fail)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    create_daily_report_partitions(["2099-01-01", "2099-01-31"])
+                )
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(read_missing_partitions(["daily_report_2099_01"]), [])
+        database_execute(
+            (), "DROP TABLE daily_report_2099_01", logger_test, "Test partitions"
+        )
+
+        # Test the read_cached_report
+        self.assertIsNone(read_cached_report("...", "2017-09-15"))
+
         # Test the daily_report
         self.assertIsNone(daily_report("...", "2017-09-15", logger_test))
         self.assertIsNone(daily_report("AdNetwork", "...", logger_test))
         self.assertIsNone(daily_report("AdNetwork", "2017-09-15", logger_test))
         self.assertIsNotNone(daily_report("SuperNetwork", "2017-09-15", logger_test))
 
+        # Test the read_report (saved rows invalidate the cached results)
+        result = read_report("2017-09-15", "2017-09-15", "SuperNetwork")
+        self.assertEqual(len(result), 1)
+        self.assertEqual(
+            read_report("2017-09-15", "2017-09-15", "SuperNetwork"), result
+        )
+        invalidate_report("SuperNetwork", ["2017-09-15"])
+        self.assertEqual(read_report.cache.stats()["size"], 0)
+        result = read_report("2017-09-15", "2017-09-15", group_by=("app", "platform"))
+        self.assertTrue(all("app" in temp_result for temp_result in result))
+
+        return
+
+    # Tests the detection of jobs on the standard input of the application
+    def test_main(self):
+        for data, expected in [
+            ("SuperNetwork,2017-09-15\n", True),
+            ("", False),
+            ("SuperNetwork\n2017-09-15\ny\n", False),
+        ]:
+            with mock.patch("sys.stdin", io.StringIO(data)):
+                self.assertEqual(read_stdin_jobs(), expected)
+                # The input is put back for the prompts or the jobs
+                self.assertEqual(sys.stdin.read(), data)
+
+        return
+
+    # Test the backfill methods
+    def test_backfill(self):
+        # Test the date_range
+        self.assertEqual(
+            date_range("2017-09-15", "2017-09-17"),
+            ["2017-09-15", "2017-09-16", "2017-09-17"],
+        )
+        self.assertEqual(date_range("2017-09-16", "2017-09-15"), [])
+
+        # Test the read_jobs
+        self.assertEqual(
+            read_jobs(
+                [
+                    "ad_network,date",
+                    "# comment",
+                    "SuperNetwork, 2017-09-15",
+                    "",
+                    '{"ad_network": "AdUmbrella", "date": "2017-09-16"}',
+                ]
+            ),
+            [("SuperNetwork", "2017-09-15"), ("AdUmbrella", "2017-09-16")],
+        )
+        self.assertRaises(ValueError, read_jobs, ["SuperNetwork"])
+        self.assertRaises(ValueError, read_jobs, ['{"date": "2017-09-15"}'])
+
+        # Test the backfill
+        summary = backfill(
+            ["SuperNetwork", "..."], "2017-09-15", "2017-09-16", logger=logger_test
+        )
+        self.assertEqual(summary["total"], 4)
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(
+            summary["failures"], [("...", "2017-09-15"), ("...", "2017-09-16")]
+        )
+
         return
 
 
@@ -219,6 +1004,32 @@ def create_duplicate_database(name, test_name):
     return
 
 
+def create_duplicate_partitioned_database(name, test_name, key):
+    """
+    Duplicates the partitioned database with the given name and renames it to
+    the given test name. The new table has a default partition, because the
+    monthly partitions still belong to the renamed table.
+    """
+    database_execute(
+        (),
+        "ALTER TABLE {table_name} RENAME TO {test_table_name}; CREATE TABLE \
+            {table_name} (LIKE {test_table_name} INCLUDING DEFAULTS, UNIQUE ({key})) \
+            PARTITION BY RANGE ({partition_key}); CREATE TABLE {test_table_name}_default \
+            PARTITION OF {table_name} DEFAULT; INSERT INTO {table_name} \
+            SELECT * FROM {test_table_name}".format(
+            table_name=name,
+            test_table_name=test_name,
+            key=", ".join(key),
+            partition_key=key[0],
+        ),
+        logger_test,
+        "Rename existing tables and create new ones",
+        False,
+    )
+
+    return
+
+
 def delete_duplicate_database(name, test_name):
     """
     Deletes the database with the given test name and renames it to the given name.
@@ -249,7 +1060,10 @@ if __name__ == "__main__":
     # Rename existing tables and create new tables
     create_duplicate_database(CURRENCY_TABLE_NAME, "test_currency_usd")
     create_duplicate_database(AD_NETWORK_TABLE_NAME, "test_ad_network")
-    create_duplicate_database(DAILY_REPORT_TABLE_NAME, "test_daily_report")
+    create_duplicate_partitioned_database(
+        DAILY_REPORT_TABLE_NAME, "test_daily_report", DAILY_REPORT_KEY
+    )
+    create_duplicate_database(APP_TABLE_NAME, "test_app")
 
     # Run tests (unittest.main() exits when tests are finished)
     unittest.TextTestRunner().run(unittest.TestLoader().loadTestsFromTestCase(Test))
@@ -258,6 +1072,7 @@ if __name__ == "__main__":
     delete_duplicate_database(CURRENCY_TABLE_NAME, "test_currency_usd")
     delete_duplicate_database(AD_NETWORK_TABLE_NAME, "test_ad_network")
     delete_duplicate_database(DAILY_REPORT_TABLE_NAME, "test_daily_report")
+    delete_duplicate_database(APP_TABLE_NAME, "test_app")
 
     # Drop the test table
     database_execute(
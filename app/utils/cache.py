@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import os
+import time
+import threading
+import inspect
+import functools
+from dotenv import load_dotenv
+from collections import OrderedDict
+
+
+# Load the .env file
+load_dotenv()
+
+# Cache
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL") or 3600)
+REPORT_QUERY_CACHE_TTL = float(os.getenv("REPORT_QUERY_CACHE_TTL") or 300)
+REPORT_QUERY_CACHE_SIZE = int(os.getenv("REPORT_QUERY_CACHE_SIZE") or 256)
+
+
+class TTLCache:
+    """
+    A thread-safe in-memory cache whose entries expire after a time to live.
+    If the size of the cache is limited, the least recently used entries are
+    evicted first. The cache counts its hits and misses. Each invalidation
+    starts a new generation of the cache, so a value computed before an
+    invalidation is not stored after it (see set).
+    """
+
+    def __init__(self, ttl=METADATA_CACHE_TTL, max_size=None):
+        """
+        @ttl: is the number of seconds an entry is valid (0 disables the cache)
+        @max_size: is the maximum number of entries or None for no limit
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # number of invalidations
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the value of key if it is cached and not expired.
+
+        @key: is the key of the entry
+        @return: a tuple of a boolean which indicates a hit and the value
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+
+            self._data.pop(key, None)
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, generation=None):
+        """
+        Stores the value of key.
+
+        @key: is the key of the entry
+        @value: is the value to be cached
+        @generation: is the generation of the cache when the computation of the
+        value started or None (the value is not stored if the cache was
+        invalidated since then)
+        """
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            # Evict the least recently used entries
+            while self.max_size is not None and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Removes the entry of key or all entries if key is None.
+
+        @key: is the key of the entry
+        """
+        with self._lock:
+            self.generation += 1
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """
+        Removes all entries whose key matches the predicate.
+
+        @predicate: is a function which takes a key and returns True if the
+        entry should be removed
+        """
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def stats(self):
+        """
+        Returns the statistics of the cache.
+
+        @return: a dictionary with the number of hits, misses and entries
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+def ttl_cache(ttl=METADATA_CACHE_TTL, valid=bool, max_size=None):
+    """
+    Decorator which memoizes a function by its arguments in a TTLCache. The
+    cache is available as the cache attribute of the decorated function. The
+    key of an entry is the tuple of all arguments (including the defaults) in
+    the order of the function signature.
+
+    @ttl: is the number of seconds a result is valid
+    @valid: is a function which decides if a result can be cached
+    @max_size: is the maximum number of cached results or None for no limit
+    @return: a decorator
+    """
+
+    def decorator(function):
+        cache = TTLCache(ttl, max_size)
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            key = arguments.args
+
+            hit, value = cache.get(key)
+            if hit:
+                return value
+
+            # A result which was computed during an invalidation is stale
+            generation = cache.generation
+            value = function(*arguments.args)
+            if valid(value):
+                cache.set(key, value, generation)
+
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -4,17 +4,19 @@
 # Import libraries
 import os
 import json
-import requests
 import datetime
+import threading
 from dotenv import load_dotenv
 from utils.logger import get_logger
-from utils.app_name_const import APP_NAME
+from utils.cache import ttl_cache
 from utils.database import database_execute
+from utils.http_session import http_get
+from utils.currency_enum import Currency
 from utils.date_format_const import DATE_FORMAT
 
 
-# Get app logger
-logger_app = get_logger(APP_NAME)
+# Get module logger
+logger_app = get_logger(__name__)
 
 
 # Load the .env file
@@ -22,12 +24,16 @@ load_dotenv()
 
 # APILayer api key
 APILAYER_API_KEY = os.getenv("APILAYER_API_KEY")
+APILAYER_API_BASE_URL = (
+    os.getenv("APILAYER_API_BASE_URL") or "https://api.apilayer.com/exchangerates_data"
+)
 
 # Constants
 CURRENCY_TABLE_NAME = "currency_usd"
-APILAYER_API_URL = (
-    "https://api.apilayer.com/exchangerates_data/convert?to={}&from={}&amount={}"
-)
+APILAYER_API_URL = APILAYER_API_BASE_URL + "/latest?base={}&symbols={}"
+
+# Lock which allows only one exchange rates refresh at the same time
+exchange_rates_lock = threading.Lock()
 
 
 def save_currency(data, many=False):
@@ -42,7 +48,7 @@ def save_currency(data, many=False):
     @many: is a boolean which indicates if data is a list of lists or a list
     @return: True if the data was saved successfully, False otherwise
     """
-    return database_execute(
+    result = database_execute(
         data=data,
         query="INSERT INTO {} (currency_usd_name, currency_usd_value) \
                 VALUES (%s, %s)".format(
@@ -53,6 +59,11 @@ def save_currency(data, many=False):
         many=many,
     )
 
+    # Cached exchange rates are not valid anymore
+    read_currency.cache.invalidate()
+
+    return result
+
 
 def update_currency(currency, value):
     """
@@ -62,7 +73,7 @@ def update_currency(currency, value):
     @value: is the value of the currency exchange rate
     @return: True if the data was updated successfully, False otherwise
     """
-    return database_execute(
+    result = database_execute(
         data=(value,),
         query="UPDATE {} SET currency_usd_value=%s, \
                 currency_usd_updated_at = NOW() \
@@ -74,10 +85,17 @@ def update_currency(currency, value):
         many=False,
     )
 
+    # Cached exchange rate of the currency is not valid anymore
+    read_currency.cache.invalidate((currency,))
+
+    return result
+
 
+@ttl_cache(valid=lambda result: len(result) == 3)
 def read_currency(currency):
     """
-    Reads the USD currency exchange rate from database.
+    Reads the USD currency exchange rate from database. Results are cached for
+    METADATA_CACHE_TTL seconds and invalidated when currencies are changed.
 
     @currency: is the name of the currency
     @return: a tuple with the id, value of the currency exchange rate and the date
@@ -100,9 +118,131 @@ def read_currency(currency):
     return currency[0], float(currency[1]), currency[2].date().strftime(DATE_FORMAT)
 
 
+def update_currencies(rates):
+    """
+    Updates the exchange rates and dates of many currencies with one statement.
+
+    @rates: is a dictionary of Currency enum -> value of the exchange rate
+    @return: True if the data was updated successfully, False otherwise
+    """
+    if not rates:
+        return False
+
+    result = database_execute(
+        data=[
+            value
+            for currency, rate in rates.items()
+            for value in (currency.value, rate)
+        ],
+        query="UPDATE {} SET currency_usd_value = rates.value, \
+                currency_usd_updated_at = NOW() \
+                FROM (VALUES {}) AS rates (name, value) \
+                WHERE currency_usd_name = rates.name".format(
+            CURRENCY_TABLE_NAME, ", ".join(["(%s, %s::DECIMAL)"] * len(rates))
+        ),
+        logger=logger_app,
+        logger_message="Data was updated successfully",
+        many=False,
+    )
+
+    # Cached exchange rates are not valid anymore
+    read_currency.cache.invalidate()
+
+    return result
+
+
+def fetch_exchange_rates(logger):
+    """
+    Gets the currency/USD exchange rates of all supported currencies from the
+    APILayer API with a single request.
+
+    @logger: is the logger object
+    @return: a dictionary of Currency enum -> value of the exchange rate
+    """
+    currencies = [currency for currency in Currency if currency != Currency.USD]
+    headers = {"apikey": APILAYER_API_KEY}
+
+    try:
+        # Get the USD/currency exchange rates of all currencies
+        response = http_get(
+            APILAYER_API_URL.format(
+                Currency.USD.value,
+                ",".join(currency.value for currency in currencies),
+            ),
+            headers=headers,
+        )
+    except Exception:
+        logger.error("APILayer request has failed")
+        return {}
+
+    # Check if the request was successful
+    if response.status_code != 200:
+        logger.warning("APILayer request was unsuccessful")
+        return {}
+
+    logger.info("APILayer request was successful")
+    try:
+        rates = json.loads(response.text)["rates"]
+    except (ValueError, KeyError, TypeError):
+        logger.warning("APILayer response is not valid")
+        return {}
+
+    # Invert the USD/currency rates into currency/USD rates
+    result = {Currency.USD: 1.0}
+    for currency in currencies:
+        try:
+            result[currency] = round(1 / float(rates[currency.value]), 6)
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            logger.warning("APILayer has no rate for %s", currency.value)
+
+    return result
+
+
+def refresh_exchange_rates(logger):
+    """
+    Gets the exchange rates of all currencies and stores them into the
+    database. Only one refresh runs at the same time, other calls return
+    immediately.
+
+    @logger: is the logger object
+    @return: True if the exchange rates were updated, False otherwise
+    """
+    if not exchange_rates_lock.acquire(blocking=False):
+        return False
+
+    try:
+        result = update_currencies(fetch_exchange_rates(logger))
+        if result:
+            logger.info("Currency exchange rates were updated")
+        return bool(result)
+    finally:
+        exchange_rates_lock.release()
+
+
+def refresh_exchange_rates_background(logger):
+    """
+    Starts refresh_exchange_rates in a background thread, unless a refresh is
+    already running.
+
+    @logger: is the logger object
+    @return: the started thread or None
+    """
+    if exchange_rates_lock.locked():
+        return None
+
+    thread = threading.Thread(
+        target=refresh_exchange_rates, args=(logger,), name="exchange-rates"
+    )
+    thread.start()
+    return thread
+
+
 def get_exchange_rate_usd(currency, logger, update=True):
     """
-    Gets the value of the currency/USD exchange rate from the APILayer API.
+    Gets the value of the currency/USD exchange rate from the database. If the
+    exchange rate is older than a week and update is True, all exchange rates
+    are refreshed from the APILayer API in the background, so the caller never
+    waits for the network.
 
     @currency: is a Currency enum which indicates the currency to be converted
     @logger: is the logger object
@@ -118,26 +258,8 @@ def get_exchange_rate_usd(currency, logger, update=True):
         datetime.datetime.now() - datetime.timedelta(days=7)
     ).date()  # 1 week ago
 
-    # If the currency/USD exchange rate is not to old, return the value
-    if not week_date > currency_date or not update:
-        return result
-
-    headers = {"apikey": APILAYER_API_KEY}
-
-    # Convert amount from EUR to USD
-    response = requests.request(
-        "GET", APILAYER_API_URL.format("USD", currency.value, 1), headers=headers
-    )
-
-    status_code = response.status_code
-
-    # Check if the request was successful
-    if status_code == 200:
-        logger.info("APILayer request was successful")
-        result = float(json.loads(response.text)["result"])
-
-        # Update the currency/USD exchange rate and date
-        if update_currency(currency, result):
-            logger.info("Currency exchange rate was updated")
+    # If the currency/USD exchange rate is too old, refresh all exchange rates
+    if week_date > currency_date and update:
+        refresh_exchange_rates_background(logger)
 
     return result
@@ -3,8 +3,15 @@
 
 # Import libraries
 import os
-import psycopg2
+import time
+import threading
 from dotenv import load_dotenv
+from contextlib import contextmanager
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics_database_seconds, metrics_database_errors
+
+# Import heavy libraries lazily
+psycopg2 = lazy_import("psycopg2")
 
 
 # Load the .env file
@@ -17,6 +24,16 @@ DATABASE_DB = os.getenv("DATABASE_DB")
 DATABASE_HOST = os.getenv("DATABASE_HOST")
 DATABASE_PORT = os.getenv("DATABASE_PORT")
 
+# Database connection pool
+DATABASE_POOL_MIN = int(os.getenv("DATABASE_POOL_MIN") or 1)
+DATABASE_POOL_MAX = int(os.getenv("DATABASE_POOL_MAX") or 10)
+DATABASE_POOL_MAX_LIFETIME = float(os.getenv("DATABASE_POOL_MAX_LIFETIME") or 1800)
+DATABASE_POOL_MAX_IDLE = float(os.getenv("DATABASE_POOL_MAX_IDLE") or 300)
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT") or 30)
+
+# Constants
+DATABASE_POOL_HEALTH_CHECK_INTERVAL = 30  # seconds a connection may idle unchecked
+
 
 def database_connect():
     """
@@ -38,7 +55,305 @@ def database_connect():
     return connection
 
 
-def database_execute(data, query, logger, logger_message, many=False):
+class DatabasePool:
+    """
+    A thread-safe pool of PostgreSQL connections. Connections are reused across
+    queries, checked with a lightweight query after being idle and replaced
+    once they exceed their maximum lifetime.
+    """
+
+    def __init__(
+        self,
+        min_size=DATABASE_POOL_MIN,
+        max_size=DATABASE_POOL_MAX,
+        max_lifetime=DATABASE_POOL_MAX_LIFETIME,
+        max_idle=DATABASE_POOL_MAX_IDLE,
+        timeout=DATABASE_POOL_TIMEOUT,
+        connect=database_connect,
+    ):
+        """
+        Creates an empty pool, connections are opened lazily.
+
+        @min_size: is the number of idle connections kept open
+        @max_size: is the maximum number of open connections
+        @max_lifetime: is the number of seconds after which a connection is replaced
+        @max_idle: is the number of seconds after which idle connections above
+        min_size are closed
+        @timeout: is the number of seconds to wait for a free connection
+        @connect: is a function which opens a new connection
+        """
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.connect = connect
+
+        self._idle = []  # list of (connection, created_at, last_used_at)
+        self._created = {}  # id(connection) -> created_at of checked out connections
+        self._size = 0  # number of open connections
+        self._condition = threading.Condition()
+
+    def _open(self):
+        """
+        Opens a new connection and returns it with its creation time.
+
+        @return: a tuple of the connection and its creation time
+        """
+        connection = self.connect()
+        return connection, time.monotonic()
+
+    def _close(self, connection):
+        """
+        Closes a connection and ignores any error.
+
+        @connection: is the connection to be closed
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, connection, created_at, last_used_at):
+        """
+        Checks if an idle connection can still be used.
+
+        @connection: is the connection to be checked
+        @created_at: is the time when the connection was opened
+        @last_used_at: is the time when the connection was last returned
+        @return: True if the connection can be used, False otherwise
+        """
+        now = time.monotonic()
+        if connection.closed or now - created_at > self.max_lifetime:
+            return False
+
+        # Only ping connections which were idle for a while
+        if now - last_used_at < DATABASE_POOL_HEALTH_CHECK_INTERVAL:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except (Exception, psycopg2.DatabaseError):
+            return False
+
+    def get(self):
+        """
+        Takes a connection from the pool, opening a new one if needed.
+
+        @return: connection to PostgreSQL database
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            idle = None
+            with self._condition:
+                while True:
+                    # Take an idle connection, it is checked outside the lock
+                    if self._idle:
+                        idle = self._idle.pop()
+                        break
+
+                    # Open a new connection if the pool is not full
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    # Wait until a connection is returned to the pool
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise psycopg2.OperationalError(
+                            "Database connection pool is exhausted"
+                        )
+                    self._condition.wait(remaining)
+
+            if idle is None:
+                break
+
+            # Reuse the idle connection if it is still healthy (the health check
+            # might wait for the network, so other borrowers are not blocked)
+            connection, created_at, last_used_at = idle
+            if self._is_healthy(connection, created_at, last_used_at):
+                with self._condition:
+                    self._created[id(connection)] = created_at
+                return connection
+
+            self._close(connection)
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+
+        try:
+            connection, created_at = self._open()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._created[id(connection)] = created_at
+        return connection
+
+    def put(self, connection, discard=False):
+        """
+        Returns a connection to the pool.
+
+        @connection: is the connection to be returned
+        @discard: is a boolean which indicates if the connection should be closed
+        """
+        with self._condition:
+            created_at = self._created.pop(id(connection), time.monotonic())
+            now = time.monotonic()
+
+            if (
+                discard
+                or connection.closed
+                or now - created_at > self.max_lifetime
+                or len(self._idle) >= self.max_size
+            ):
+                self._close(connection)
+                self._size -= 1
+            else:
+                self._idle.append((connection, created_at, now))
+
+            # Close connections above the minimum size which idle for too long
+            while (
+                len(self._idle) > self.min_size
+                and now - self._idle[0][2] > self.max_idle
+            ):
+                self._close(self._idle.pop(0)[0])
+                self._size -= 1
+
+            self._condition.notify()
+
+    def close(self):
+        """
+        Closes all idle connections in the pool.
+        """
+        with self._condition:
+            for connection, _, _ in self._idle:
+                self._close(connection)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Returns the current state of the pool.
+
+        @return: a dictionary with the number of open, idle and used connections
+        """
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "used": self._size - len(self._idle),
+            }
+
+
+# Process wide connection pool and the connection bound to the current thread
+database_pool = DatabasePool()
+database_local = threading.local()
+
+
+@contextmanager
+def database_connection():
+    """
+    Yields a pooled connection. If the current thread is inside a
+    database_transaction, the connection of the transaction is used instead.
+
+    @return: connection to PostgreSQL database
+    """
+    connection = getattr(database_local, "connection", None)
+    if connection is not None:
+        yield connection
+        return
+
+    connection = database_pool.get()
+    discard = False
+    try:
+        yield connection
+    except (Exception, psycopg2.DatabaseError):
+        # Connection might be broken, don't return it to the pool
+        discard = bool(connection.closed)
+        raise
+    finally:
+        database_pool.put(connection, discard)
+
+
+@contextmanager
+def database_transaction():
+    """
+    Runs all database_execute calls of the current thread on a single pooled
+    connection inside one transaction. The transaction is committed on exit or
+    rolled back if an exception is raised. Nested calls join the outer
+    transaction. Note that a failed query aborts the whole transaction.
+
+    @return: connection to PostgreSQL database (None if it can't be opened)
+    """
+    # Join the transaction which is already open
+    if getattr(database_local, "connection", None) is not None:
+        yield database_local.connection
+        return
+
+    try:
+        connection = database_pool.get()
+    except (Exception, psycopg2.DatabaseError):
+        # Database is not reachable, let each query report its own error
+        yield None
+        return
+
+    discard = False
+    connection.autocommit = False
+    database_local.connection = connection
+    try:
+        yield connection
+        connection.commit()
+    except BaseException:
+        try:
+            connection.rollback()
+        except (Exception, psycopg2.DatabaseError):
+            discard = True
+        raise
+    finally:
+        database_local.connection = None
+        try:
+            connection.autocommit = True
+        except (Exception, psycopg2.DatabaseError):
+            discard = True
+        database_pool.put(connection, discard)
+
+
+@contextmanager
+def database_autocommit():
+    """
+    Runs the database_execute calls inside the context on their own pooled
+    connections in autocommit mode, even if the current thread is inside a
+    database_transaction. A failed query therefore doesn't abort the
+    transaction and the locks of a query are not held until it is committed.
+    """
+    connection = getattr(database_local, "connection", None)
+    database_local.connection = None
+    try:
+        yield
+    finally:
+        database_local.connection = connection
+
+
+def database_statement(query):
+    """
+    Returns the statement of a query, which labels its metrics.
+
+    @query: is the query (string)
+    @return: the first keyword of the query (e.g. SELECT, INSERT, COPY)
+    """
+    return (query.split(None, 1) or [""])[0].upper()
+
+
+def database_execute(
+    data, query, logger, logger_message, many=False, fetch_all=False
+):
     """
     Executes a query on the database and returns the result.
 
@@ -47,38 +362,90 @@ def database_execute(data, query, logger, logger_message, many=False):
     @logger: logger object
     @logger_message: message to be logged
     @many: is a boolean which indicates if data is a list of lists or a list
+    @fetch_all: is a boolean which indicates if all result rows should be returned
     @return: result of the query (boolean, list or a list of lists)
     """
+    statement = database_statement(query)
     try:
-        # Create a PostgreSQL connection
-        connection = database_connect()
+        # Take a PostgreSQL connection from the pool (the wait is measured too)
+        with metrics_database_seconds.time(statement=statement):
+            with database_connection() as connection:
+                # Creating a cursor object using the cursor() method
+                with connection.cursor() as cursor:
+                    # Executing the SQL query
+                    cursor.executemany(
+                        query,
+                        data,
+                    ) if many else cursor.execute(query, data)
 
-        # Creating a cursor object using the cursor() method
-        cursor = connection.cursor()
+                    try:
+                        # Fetch the results from the database
+                        if fetch_all:
+                            result = cursor.fetchall()
+                        else:
+                            result = cursor.fetchmany() if many else cursor.fetchone()
+                    except (Exception, psycopg2.DatabaseError) as error:
+                        result = True
 
-        # Executing the SQL query
-        cursor.executemany(
-            query,
-            data,
-        ) if many else cursor.execute(query, data)
+        logger.info(logger_message)
+        return result
+    except (Exception, psycopg2.DatabaseError) as error:
+        # Print the error message
+        metrics_database_errors.inc(statement=statement)
+        logger.error(error)
+        return False
 
-        try:
-            # Fetch the results from the database
-            result = cursor.fetchmany() if many else cursor.fetchone()
-        except (Exception, psycopg2.DatabaseError) as error:
-            result = True
 
-        # Close open connections
-        cursor.close()
-        connection.close()
+def database_copy(data, query, logger, logger_message, before=(), after=()):
+    """
+    Streams data into the database with a COPY ... FROM STDIN query and returns
+    the result. Inside a database_transaction the COPY is guarded by a
+    savepoint, so a failed COPY does not abort the outer transaction.
+
+    @data: file-like object with the data to be copied (CSV or binary)
+    @query: COPY query to be executed (string)
+    @logger: logger object
+    @logger_message: message to be logged
+    @before: queries executed before the COPY on the same cursor (e.g. create
+    a staging table)
+    @after: queries executed after the COPY on the same cursor (e.g. move the
+    staged rows into the target table)
+    @return: number of rows copied (or affected by the last query) or False if
+    the copy failed
+    """
+    statement = database_statement(query)
+    try:
+        # Take a PostgreSQL connection from the pool
+        with metrics_database_seconds.time(statement=statement):
+            with database_connection() as connection:
+                with connection.cursor() as cursor:
+                    savepoint = not connection.autocommit
+                    if savepoint:
+                        cursor.execute("SAVEPOINT database_copy")
+
+                    try:
+                        for temp_query in before:
+                            cursor.execute(temp_query)
+
+                        # Stream the buffer to the database
+                        cursor.copy_expert(query, data)
+                        result = cursor.rowcount
+
+                        for temp_query in after:
+                            cursor.execute(temp_query)
+                            result = cursor.rowcount
+                    except (Exception, psycopg2.DatabaseError):
+                        if savepoint:
+                            cursor.execute("ROLLBACK TO SAVEPOINT database_copy")
+                        raise
+
+                    if savepoint:
+                        cursor.execute("RELEASE SAVEPOINT database_copy")
 
         logger.info(logger_message)
         return result
     except (Exception, psycopg2.DatabaseError) as error:
         # Print the error message
+        metrics_database_errors.inc(statement=statement)
         logger.error(error)
         return False
-    finally:
-        # Close the connection to the database if it is open
-        if connection is not None:
-            connection.close()
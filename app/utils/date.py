@@ -2,47 +2,98 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
-from dateutil.parser import parse
+from datetime import datetime
+from functools import lru_cache
 from utils.date_format_const import DATE_FORMAT
+from utils.lazy_import import lazy_import
 
+# Import heavy libraries lazily
+dateutil_parser = lazy_import("dateutil.parser")
 
-def is_date(date):
+
+# Constants
+DATE_CACHE_SIZE = 4096  # number of distinct parsed dates kept in memory
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(date, date_format=None, fallback=True):
+    """
+    Parses a date string. The date is parsed with the given format and with the
+    default format (YYYY-MM-DD) first, which is much faster than dateutil, and
+    with dateutil only if both formats don't match. Results are memoized, so
+    each distinct date is parsed only once.
+
+    @date: string to be parsed
+    @date_format: is the expected format of the date (e.g. format of Ad Network)
+    @fallback: is a boolean which indicates if the default format and dateutil
+    are used when the given format doesn't match
+    @return: a datetime object or None if the date is not valid
+    """
+    if not isinstance(date, str):
+        return None
+
+    # Try the known formats (strptime doesn't know the no padding flag "-")
+    formats = [date_format] if date_format else []
+    if fallback or not formats:
+        formats.append(DATE_FORMAT)
+    for temp_format in formats:
+        try:
+            return datetime.strptime(date, temp_format.replace("%-", "%"))
+        except ValueError:
+            pass
+
+    if not fallback:
+        return None
+
+    try:
+        return dateutil_parser.parse(date)
+    except (ValueError, OverflowError):
+        return None
+
+
+def is_date(date, date_format=None):
     """
     Checks if a string is a valid date.
 
     @date: string to be checked
+    @date_format: is the expected format of the date
     @return: True if date is valid, False otherwise
     """
-    try:
-        parse(date)
-        return True
-    except ValueError:
-        return False
+    return parse_date(date, date_format) is not None
 
 
-def convert_date(date, date_format):
+def convert_date(date, date_format, input_format=None):
     """
     Converts a date to a specific format.
 
     @date: date to be converted to a specific format
     @date_format: format to convert the date to
+    @input_format: is the expected format of the date
     @return: date in the specified format
     """
-    try:
-        return parse(date).strftime(date_format)
-    except ValueError:
+    parsed_date = parse_date(date, input_format)
+    if parsed_date is None:
         return None
 
+    return parsed_date.strftime(date_format)
+
 
-def convert_date_data_frame(data):
+def convert_date_data_frame(data, input_format=None):
     """
-    Converts the date in data frame column to a YYYY-MM-DD format.
+    Converts the date in data frame column to a YYYY-MM-DD format. Each
+    distinct date is converted only once and a categorical column stays
+    categorical.
 
     @data: is a data frame containing the data to be converted
+    @input_format: is the expected format of the dates
     @return: a data frame with the converted date
     """
-    data["Date"] = [
-        convert_date(date, DATE_FORMAT) if convert_date(date, DATE_FORMAT) else ""
-        for date in data["Date"]
-    ]
+    dates = {
+        date: convert_date(date, DATE_FORMAT, input_format) or ""
+        for date in data["Date"].unique()
+    }
+    if hasattr(data["Date"], "cat"):
+        data["Date"] = data["Date"].map(dates).astype("category")
+    else:
+        data["Date"] = data["Date"].map(dates)
     return data
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import os
+import json
+import threading
+from dotenv import load_dotenv
+from urllib.parse import urlsplit
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics_http_seconds
+
+# Import heavy libraries lazily
+requests = lazy_import("requests")
+
+
+# Load the .env file
+load_dotenv()
+
+# HTTP
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or 10)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT") or 60)
+HTTP_VALIDATORS_FILE = os.getenv("HTTP_VALIDATORS_FILE")
+
+# Session of the current thread and the stored validators (ETag, Last-Modified)
+http_local = threading.local()
+http_validators = {}
+http_validators_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the HTTP session of the current thread. Sessions keep connections
+    alive, so repeated requests to the same host reuse TCP/TLS connections.
+
+    @return: a requests session
+    """
+    session = getattr(http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        http_local.session = session
+
+    return session
+
+
+def load_validators():
+    """
+    Loads the stored validators from the validators file (if it is set).
+    """
+    if not HTTP_VALIDATORS_FILE or not os.path.isfile(HTTP_VALIDATORS_FILE):
+        return
+
+    try:
+        with open(HTTP_VALIDATORS_FILE, "r") as file:
+            validators = json.load(file)
+    except (OSError, ValueError):
+        return
+
+    with http_validators_lock:
+        http_validators.update(validators)
+
+
+def read_validators(url):
+    """
+    Reads the validators of the last successfully processed response of URL.
+
+    @url: is the URL of the response
+    @return: a dictionary with the ETag and Last-Modified values
+    """
+    with http_validators_lock:
+        return dict(http_validators.get(url, {}))
+
+
+def save_validators(url, validators):
+    """
+    Saves the validators of a successfully processed response of URL, so the
+    next request to URL can be conditional.
+
+    @url: is the URL of the response
+    @validators: is a dictionary with the ETag and Last-Modified values
+    """
+    if not validators:
+        return
+
+    with http_validators_lock:
+        http_validators[url] = dict(validators)
+
+        # Persist the validators, so they survive restarts
+        if HTTP_VALIDATORS_FILE:
+            try:
+                with open(HTTP_VALIDATORS_FILE, "w") as file:
+                    json.dump(http_validators, file)
+            except OSError:
+                pass
+
+
+def get_validators(response):
+    """
+    Gets the validators (ETag, Last-Modified) from the response headers.
+
+    @response: is a requests response
+    @return: a dictionary with the ETag and Last-Modified values
+    """
+    return {
+        key: response.headers[key]
+        for key in ("ETag", "Last-Modified")
+        if key in response.headers
+    }
+
+
+def http_get(url, conditional=False, **kwargs):
+    """
+    Sends a GET request with the session of the current thread. If conditional
+    is True, the stored validators of URL are sent, so an unchanged resource
+    is answered with 304 Not Modified.
+
+    @url: is the URL of the request
+    @conditional: is a boolean which indicates if the request is conditional
+    @return: a requests response
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    if conditional:
+        validators = read_validators(url)
+        if "ETag" in validators:
+            headers["If-None-Match"] = validators["ETag"]
+        if "Last-Modified" in validators:
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    with metrics_http_seconds.time(host=urlsplit(url).hostname or ""):
+        return get_session().get(url, headers=headers, **kwargs)
+
+
+# Load the validators of previous runs
+load_validators()
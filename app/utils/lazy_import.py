@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import sys
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    """
+    A placeholder of a module which is imported on the first access of its
+    attributes. The import itself is done by importlib, so it is thread-safe.
+    """
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self.__name__)
+
+        # Later accesses don't go through __getattr__ anymore
+        self.__dict__.update(module.__dict__)
+
+        return getattr(module, attribute)
+
+
+def lazy_import(name):
+    """
+    Returns a module which is imported only when it is used for the first time,
+    so heavy libraries (pandas, requests, psycopg2 ...) don't slow down the
+    start of the command line applications.
+
+    @name: is the name of the module (e.g. pandas)
+    @return: the module if it is already imported, a LazyModule otherwise
+    """
+    return sys.modules.get(name) or LazyModule(name)
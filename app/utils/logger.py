@@ -2,22 +2,191 @@
 # -*- coding: utf-8 -*-
 
 # Import libraries
+import os
+import copy
+import json
+import time
+import queue
+import atexit
 import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+
+# Load the .env file
+load_dotenv()
+
+# Logging
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").upper()
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "text").lower()  # text or json
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT") or 10)  # 0 disables the limit
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL") or 60)
+
+# Constants
+LOG_TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s: %(message)s"
+LOG_DATE_FORMAT = "%d-%b-%y %H:%M:%S"
+LOG_RATE_LIMIT_KEYS = 1024  # number of message templates whose windows are kept
+# Attributes of every log record (other attributes are extra fields)
+LOG_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Listener which formats and writes the records in the background
+log_listener = None
+log_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as JSON lines. Extra fields of a record (e.g.
+    logger.info("...", extra={"ad_network": "..."})) are added as keys.
+    """
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in LOG_RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Passes at most limit warnings of the same logging call (the file and the
+    line of the call) and message template in each interval. Warnings are
+    limited by their unformatted template and not by their message, so the
+    values of a warning (e.g. the name of a report) must be passed as %-style
+    arguments. The number of suppressed warnings is added to the first warning
+    of the next interval, so repetitive warnings (e.g. of each report or row)
+    don't flood the log.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, interval=LOG_RATE_LIMIT_INTERVAL):
+        """
+        @limit: is the number of warnings passed in each interval (0 disables it)
+        @interval: is the length of an interval in seconds
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}  # (file, line, template) -> [start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno != logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                self._forget(now)
+            elif window[1] < self.limit:
+                suppressed = 0
+                window[1] += 1
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed:
+            record.suppressed = suppressed
+
+        return True
+
+    def _forget(self, now):
+        """
+        Removes the expired windows without suppressed warnings when there are
+        too many windows (the lock must be held).
+
+        @now: is the current time
+        """
+        if len(self._windows) <= LOG_RATE_LIMIT_KEYS:
+            return
+
+        for key, (start, _, suppressed) in list(self._windows.items()):
+            if now - start >= self.interval and not suppressed:
+                del self._windows[key]
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts log records into a queue without formatting them, so the logging
+    thread only pays for the queue put.
+    """
+
+    def prepare(self, record):
+        # Merge the arguments now, because they might change later
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        # The suppressed warnings are a part of the message of the record
+        if getattr(record, "suppressed", 0):
+            record.msg += " ({} similar messages were suppressed)".format(
+                record.suppressed
+            )
+
+        return record
+
+
+def configure_logging(level=LOG_LEVEL, log_format=LOG_FORMAT):
+    """
+    Configures the logging of the process once. Records of all loggers are
+    rate limited and put into a queue by the logging threads, and formatted
+    and written to the standard error by a single background listener.
+
+    @level: is the minimum level of the logged records (e.g. INFO)
+    @log_format: is the format of the records (text or json)
+    """
+    global log_listener
+
+    with log_lock:
+        if log_listener is not None:
+            return
+
+        handler = logging.StreamHandler()
+        if log_format == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(
+                logging.Formatter(LOG_TEXT_FORMAT, datefmt=LOG_DATE_FORMAT)
+            )
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = LogQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(queue_handler)
+
+        log_listener = logging.handlers.QueueListener(log_queue, handler)
+        log_listener.start()
+
+        # Write the queued records before the process exits
+        atexit.register(log_listener.stop)
 
 
 def get_logger(logger_name):
     """
-    Configures the logger and returns it.
+    Returns the named logger (e.g. the name of the module). Logging is
+    configured on the first call (see configure_logging).
 
     @logger_name: name of the logger
     @return: a logger object
     """
-    # Config logger
-    logging.basicConfig(
-        format="%(asctime)s - %(levelname)s - {}: %(message)s".format(logger_name),
-        level=logging.INFO,
-        datefmt="%d-%b-%y %H:%M:%S",
-    )
+    configure_logging()
 
-    logger = logging.getLogger()
-    return logger
+    return logging.getLogger(logger_name)
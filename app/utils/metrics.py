@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import abc
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+
+# Constants
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds of the latency buckets (seconds)
+METRICS_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+# Registered metrics in the order of their creation
+metrics_registry = []
+
+
+def format_value(value):
+    """
+    Formats a sample value in the Prometheus text format.
+
+    @value: is a number
+    @return: a string
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+def format_labels(labels):
+    """
+    Formats the labels of a sample in the Prometheus text format.
+
+    @labels: is a list of (name, value) tuples
+    @return: a string -> {name="value",...} or an empty string
+    """
+    if not labels:
+        return ""
+
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+    )
+
+
+class Metric(abc.ABC):
+    """
+    A thread-safe metric with a value for each combination of its labels.
+    Metrics are registered when they are created, so they are rendered by
+    render_metrics. Subclasses define the type and the samples of the metric.
+    """
+
+    type = None
+
+    def __init__(self, name, description, labels=(), registry=metrics_registry):
+        """
+        @name: is the name of the metric (e.g. apps7_rows_read_total)
+        @description: is the help text of the metric
+        @labels: is a tuple of label names
+        @registry: is the list the metric is registered into
+        """
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels):
+        """
+        Returns the label values of a sample in the order of the label names.
+
+        @labels: is a dictionary of label names and values
+        @return: a tuple of label values
+        """
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                "Labels of {} are {}, not {}".format(
+                    self.name, list(self.labels), sorted(labels)
+                )
+            )
+
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def reset(self):
+        """
+        Removes all values of the metric.
+        """
+        with self._lock:
+            self._values.clear()
+
+    @abc.abstractmethod
+    def samples(self):
+        """
+        Returns the samples of the metric.
+
+        @return: a list of (suffix, labels, value) tuples, where labels is a
+        list of (name, value) tuples
+        """
+
+    def render(self):
+        """
+        Renders the metric in the Prometheus text format.
+
+        @return: a string
+        """
+        lines = [
+            "# HELP {} {}".format(self.name, self.description),
+            "# TYPE {} {}".format(self.name, self.type),
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(
+                "{}{}{} {}".format(
+                    self.name, suffix, format_labels(labels), format_value(value)
+                )
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """
+    A metric which only goes up (e.g. the number of processed rows).
+    """
+
+    type = "counter"
+
+    def inc(self, value=1, **labels):
+        """
+        Increases the counter.
+
+        @value: is the increment (not negative)
+        @labels: are the label values of the counter
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, **labels):
+        """
+        Returns the value of the counter.
+
+        @labels: are the label values of the counter
+        @return: the value of the counter
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [("", list(zip(self.labels, key)), value) for key, value in values]
+
+
+class Histogram(Metric):
+    """
+    A metric which counts observations (e.g. latencies) in cumulative buckets
+    and keeps their sum and count.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name,
+        description,
+        labels=(),
+        buckets=METRICS_BUCKETS,
+        registry=metrics_registry,
+    ):
+        """
+        @name: is the name of the metric (e.g. apps7_stage_seconds)
+        @description: is the help text of the metric
+        @labels: is a tuple of label names
+        @buckets: is a sorted tuple of the upper bounds of the buckets
+        @registry: is the list the metric is registered into
+        """
+        super().__init__(name, description, labels, registry)
+        self.buckets = tuple(buckets)
+
+    def _empty(self):
+        """
+        Returns the counts of a new combination of labels (the last count is
+        of the observations above the last bucket).
+
+        @return: a list of zeros
+        """
+        return [0] * (len(self.buckets) + 1)
+
+    def observe(self, value, **labels):
+        """
+        Adds an observation to the histogram.
+
+        @value: is the observed value
+        @labels: are the label values of the histogram
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or (self._empty(), 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the number of seconds spent inside the context (also when an
+        exception is raised).
+
+        @labels: are the label values of the histogram
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels):
+        """
+        Returns the number and the sum of the observations.
+
+        @labels: are the label values of the histogram
+        @return: a tuple of the count and the sum
+        """
+        with self._lock:
+            counts, total = self._values.get(self._key(labels)) or ([], 0)
+
+            return sum(counts), total
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+
+        samples = []
+        for key, (counts, total) in values:
+            labels = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    ("_bucket", labels + [("le", format_value(bound))], cumulative)
+                )
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+
+        return samples
+
+
+def render_metrics(registry=metrics_registry):
+    """
+    Renders all registered metrics in the Prometheus text format.
+
+    @registry: is a list of metrics
+    @return: a string
+    """
+    return "".join(metric.render() for metric in registry)
+
+
+# Metrics of the daily report pipeline
+metrics_stage_seconds = Histogram(
+    "apps7_stage_seconds",
+    "Duration of the stages of the daily report pipeline.",
+    ("stage", "ad_network"),
+)
+metrics_rows_read = Counter(
+    "apps7_rows_read_total",
+    "Rows of the daily reports which were read.",
+    ("ad_network",),
+)
+metrics_rows_rejected = Counter(
+    "apps7_rows_rejected_total",
+    "Rows of the daily reports which were rejected by the analysis.",
+    ("ad_network",),
+)
+metrics_rows_written = Counter(
+    "apps7_rows_written_total",
+    "Clustered rows of the daily reports which were saved into the database.",
+    ("ad_network",),
+)
+
+# Metrics of the database and HTTP calls
+metrics_database_seconds = Histogram(
+    "apps7_database_execute_seconds",
+    "Duration of the database queries by their statement.",
+    ("statement",),
+)
+metrics_database_errors = Counter(
+    "apps7_database_errors_total",
+    "Database queries which failed by their statement.",
+    ("statement",),
+)
+metrics_http_seconds = Histogram(
+    "apps7_http_request_seconds",
+    "Duration of the HTTP requests (until the headers are received) by host.",
+    ("host",),
+)
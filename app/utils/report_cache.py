@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import io
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+
+# Load the .env file
+load_dotenv()
+
+# Report cache
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ".cache",
+    "reports",
+)
+REPORT_CACHE_MAX_SIZE = int(os.getenv("REPORT_CACHE_MAX_SIZE") or 1024**3)
+
+# Constants
+REPORT_CACHE_INDEX = "index.json"
+REPORT_CACHE_OBJECTS = "objects"
+
+
+class CachingReader(io.RawIOBase):
+    """
+    A binary file-like object which reads from another file-like object and
+    writes everything it reads into a file, while computing its SHA-256 hash.
+    """
+
+    def __init__(self, stream, file, path):
+        """
+        @stream: is the file-like object to be read
+        @file: is the binary file where the read data is written
+        @path: is the path of the file
+        """
+        self.stream = stream
+        self.file = file
+        self.path = path
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        if not data:
+            return 0
+
+        self.hash.update(data)
+        self.file.write(data)
+        self.size += len(data)
+
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class ReportCache:
+    """
+    A content-addressed on-disk store of raw daily reports. Each report is
+    stored once under the SHA-256 hash of its content and the index maps
+    (ad network, date) keys to hashes. When the store grows above its maximum
+    size, the least recently used reports are evicted.
+    """
+
+    def __init__(self, directory=REPORT_CACHE_DIR, max_size=REPORT_CACHE_MAX_SIZE):
+        """
+        @directory: is the directory of the store
+        @max_size: is the maximum size of the stored reports in bytes (0 disables
+        the store)
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _key(self, ad_network, date):
+        return "{}/{}".format(ad_network, date)
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.directory, REPORT_CACHE_OBJECTS, content_hash)
+
+    def _load(self):
+        """
+        Loads the index from disk (only once).
+
+        @return: a dictionary of key -> {hash, size, accessed}
+        """
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, REPORT_CACHE_INDEX)) as file:
+                    self._index = json.load(file)
+            except (OSError, ValueError):
+                self._index = {}
+
+        return self._index
+
+    def _dump(self):
+        """
+        Writes the index to disk atomically.
+        """
+        path = os.path.join(self.directory, REPORT_CACHE_INDEX)
+        file, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file, "w") as file:
+            json.dump(self._index, file)
+        os.replace(temp_path, path)
+
+    def _evict(self):
+        """
+        Removes the least recently used reports until the store fits into its
+        maximum size. Objects are removed when no key refers to them.
+        """
+        index = self._load()
+        sizes = {entry["hash"]: entry["size"] for entry in index.values()}
+        total = sum(sizes.values())
+
+        for key in sorted(index, key=lambda x: index[x]["accessed"]):
+            if total <= self.max_size:
+                break
+
+            content_hash = index.pop(key)["hash"]
+            if any(entry["hash"] == content_hash for entry in index.values()):
+                continue
+
+            total -= sizes[content_hash]
+            try:
+                os.remove(self._object_path(content_hash))
+            except OSError:
+                pass
+
+    def open_writer(self, stream):
+        """
+        Wraps a binary stream, so all data read from it is written into a
+        temporary file of the store. Call save with the returned reader after
+        the stream was read completely.
+
+        @stream: is the binary file-like object to be read
+        @return: a CachingReader
+        """
+        os.makedirs(os.path.join(self.directory, REPORT_CACHE_OBJECTS), exist_ok=True)
+        file, path = tempfile.mkstemp(dir=self.directory)
+        return CachingReader(stream, os.fdopen(file, "wb"), path)
+
+    def save(self, ad_network, date, reader):
+        """
+        Stores the data written by reader under the (ad network, date) key.
+
+        @ad_network: is the name of the ad network
+        @date: is the date of the report
+        @reader: is a CachingReader returned by open_writer
+        @return: the hash of the stored report
+        """
+        reader.file.close()
+        content_hash = reader.hash.hexdigest()
+
+        with self._lock:
+            # The same content is stored only once
+            if os.path.isfile(self._object_path(content_hash)):
+                os.remove(reader.path)
+            else:
+                os.replace(reader.path, self._object_path(content_hash))
+
+            self._load()[self._key(ad_network, date)] = {
+                "hash": content_hash,
+                "size": reader.size,
+                "accessed": time.time(),
+            }
+            self._evict()
+            self._dump()
+
+        return content_hash
+
+    def discard(self, reader):
+        """
+        Removes the temporary file of a reader which should not be stored.
+
+        @reader: is a CachingReader returned by open_writer
+        """
+        reader.file.close()
+        try:
+            os.remove(reader.path)
+        except OSError:
+            pass
+
+    def open(self, ad_network, date):
+        """
+        Opens the stored report of the (ad network, date) key.
+
+        @ad_network: is the name of the ad network
+        @date: is the date of the report
+        @return: a binary file object or None if the report is not stored
+        """
+        with self._lock:
+            entry = self._load().get(self._key(ad_network, date))
+            if entry is None:
+                return None
+
+            try:
+                file = open(self._object_path(entry["hash"]), "rb")
+            except OSError:
+                return None
+
+            entry["accessed"] = time.time()
+            self._dump()
+
+        return file
+
+
+# Process wide report cache
+report_cache = ReportCache()
@@ -16,10 +16,13 @@ def update_revenue(data, currency, logger, update=True):
     @update: is a boolean to indicate if the data should be updated or not
     @return: a data frame with the converted revenue
     """
+    revenue = data[data.keys()[-1]]
+    # Numeric revenue was parsed without currency symbols
+    if revenue.dtype.kind != "f":
+        revenue = revenue.str.replace("[^0-9|.]", "", regex=True)
+
     return (
-        data[data.keys()[-1]]
-        .str.replace("[^0-9|.]", "", regex=True)
-        .astype(float)
+        revenue.astype(float)
         .multiply(
             get_exchange_rate_usd(currency=currency, logger=logger, update=update)
         )
@@ -42,32 +45,39 @@ def convert_revenue(data, logger, update=True):
     # Flag to indicate if the report revenue is in USD currency
     currency = None
 
+    # Numeric revenue has no currency symbols, only its column name has the code
+    revenue = data[data.keys()[-1]]
+    numeric = revenue.dtype.kind == "f"
+
+    def contains(symbol):
+        return not numeric and revenue.str.contains(symbol).any()
+
     # If revenue is in USD, don't convert it
-    if data[data.keys()[-1]].str.contains("\$").any() or "(usd)" in data.keys()[-1]:
+    if contains("\$") or "(usd)" in data.keys()[-1]:
         currency = Currency.USD
         # Remove any unusual USD symbols
         data[data.keys()[-1]] = update_revenue(data, Currency.USD, logger, update)
 
     # If revenue is in EUR, convert it to USD
-    elif data[data.keys()[-1]].str.contains("\€").any() or "(eur)" in data.keys()[-1]:
+    elif contains("\€") or "(eur)" in data.keys()[-1]:
         currency = Currency.USD
         # Remove any unusual EUR symbols and convert to USD
         data[data.keys()[-1]] = update_revenue(data, Currency.EUR, logger, update)
 
     # If revenue is in GBP, convert it to USD
-    elif data[data.keys()[-1]].str.contains("\£").any() or "(gbp)" in data.keys()[-1]:
+    elif contains("\£") or "(gbp)" in data.keys()[-1]:
         currency = Currency.USD
         # Remove any unusual GBP symbols and convert to USD
         data[data.keys()[-1]] = update_revenue(data, Currency.GBP, logger, update)
 
     # If revenue is in CNY, convert it to USD
-    elif data[data.keys()[-1]].str.contains("\¥").any() or "(cny)" in data.keys()[-1]:
+    elif contains("\¥") or "(cny)" in data.keys()[-1]:
         currency = Currency.USD
         # Remove any unusual CNY symbols and convert to USD
         data[data.keys()[-1]] = update_revenue(data, Currency.CNY, logger, update)
 
     # If revenue is in HKD, convert it to USD
-    elif data[data.keys()[-1]].str.contains("HK\$").any() or "(hkd)" in data.keys()[-1]:
+    elif contains("HK\$") or "(hkd)" in data.keys()[-1]:
         currency = Currency.USD
         # Remove any unusual HKD symbols and convert to USD
         data[data.keys()[-1]] = update_revenue(data, Currency.HKD, logger, update)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+from utils.lazy_import import lazy_import
+
+# Import heavy libraries lazily
+pd = lazy_import("pandas")
+
+
+# Constants
+SCHEMA_CATEGORY_COLUMNS = 3  # Date, App and Platform (by position)
+SCHEMA_COUNTER_COLUMNS = 2  # Requests and Impressions (after the categories)
+INT32_MIN = -(2**31)
+INT32_MAX = 2**31 - 1
+
+
+def compact_counter(values):
+    """
+    Converts integer counters into int32 if all values fit into it and into
+    int64 otherwise. Values which are not integers (e.g. NaN of invalid
+    values) are returned unchanged.
+
+    @values: is a series of numbers
+    @return: a series of numbers
+    """
+    if values.dtype.kind not in "iu":
+        return values
+
+    if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX):
+        return values.astype("int64")
+
+    return values.astype("int32")
+
+
+def compact_revenue(values):
+    """
+    Converts the revenue into float64 if all values are plain numbers. Values
+    with currency symbols are kept as strings.
+
+    @values: is a series of strings
+    @return: a series of numbers or the original series of strings
+    """
+    revenue = pd.to_numeric(values, errors="coerce")
+    if revenue.notna().all():
+        return revenue.astype("float64")
+
+    return values
+
+
+def compact_chunk(chunk):
+    """
+    Converts a chunk of a raw daily report (all values are strings) into a
+    compact schema: Date, App and Platform are categorical and Requests and
+    Impressions are int32 or int64 (float64 if any value is not a number, so
+    the analysis can reject it). Revenue is kept as strings, because its type
+    is decided only when all chunks are seen (see concat_chunks).
+
+    @chunk: is a data frame of strings
+    @return: the compact data frame
+    """
+    columns = list(chunk.columns)
+    for position, column in enumerate(columns):
+        values = chunk[column]
+        if position < SCHEMA_CATEGORY_COLUMNS:
+            chunk[column] = values.astype("category")
+        elif position < SCHEMA_CATEGORY_COLUMNS + SCHEMA_COUNTER_COLUMNS:
+            chunk[column] = compact_counter(pd.to_numeric(values, errors="coerce"))
+
+    return chunk
+
+
+def concat_chunks(chunks):
+    """
+    Concatenates compact chunks into a single data frame. Categories of all
+    chunks are united, so categorical columns stay categorical. Revenue (the
+    last column) is converted into float64 only if the values of all chunks
+    are plain numbers, otherwise the original strings are kept (converting the
+    numbers back would change their notation, e.g. 1e-05).
+
+    @chunks: is an iterable of compact data frames (see compact_chunk)
+    @return: a data frame
+    """
+    chunks = list(chunks)
+    if len(chunks) > 1:
+        for column in chunks[0].columns:
+            values = [chunk[column] for chunk in chunks]
+            if all(isinstance(value.dtype, pd.CategoricalDtype) for value in values):
+                categories = pd.api.types.union_categoricals(values).categories
+                for chunk in chunks:
+                    chunk[column] = chunk[column].cat.set_categories(categories)
+
+    data = pd.concat(chunks, ignore_index=True)
+    if len(data.columns) > SCHEMA_CATEGORY_COLUMNS + SCHEMA_COUNTER_COLUMNS:
+        data[data.columns[-1]] = compact_revenue(data[data.columns[-1]])
+
+    return data
+
+
+def memory_per_row(data):
+    """
+    Returns the memory of a data frame per row (including the strings).
+
+    @data: is a data frame
+    @return: the number of bytes per row
+    """
+    return float(data.memory_usage(deep=True).sum()) / max(len(data), 1)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import libraries
+import io
+import json
+import zlib
+from utils.lazy_import import lazy_import
+
+# Import heavy libraries lazily
+pd = lazy_import("pandas")
+
+
+# Constants
+SERIALIZE_CHUNK_ROWS = 10000  # number of rows serialized at once
+FORMAT_JSON = "application/json"  # pandas table format (schema and records)
+FORMAT_COLUMNAR = "application/vnd.apps7.columnar+json"  # columns and values
+FORMAT_CSV = "text/csv"
+FORMATS = [FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_CSV]
+
+
+def negotiate_format(accept):
+    """
+    Chooses the format of a response from the Accept header. The supported
+    format with the highest quality is chosen, JSON is the default.
+
+    @accept: is the value of the Accept header or None
+    @return: the content type of the format
+    """
+    choices = []
+    for position, value in enumerate((accept or "").split(",")):
+        content_type, *parameters = [part.strip() for part in value.split(";")]
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+
+        if content_type.lower() in FORMATS and quality > 0:
+            choices.append((-quality, position, content_type.lower()))
+
+    return min(choices)[2] if choices else FORMAT_JSON
+
+
+def serialize_table(data, chunk_rows=SERIALIZE_CHUNK_ROWS):
+    """
+    Serializes a data frame into the same JSON as data.to_json(orient="table")
+    in chunks of rows, so the whole JSON document is never held in memory.
+
+    @data: is a data frame
+    @chunk_rows: is the number of rows in each chunk
+    @return: a generator of strings
+    """
+    schema = pd.io.json.build_table_schema(data)
+    yield '{"schema":' + json.dumps(schema, separators=(",", ":"))
+    yield ',"data":['
+    for start in range(0, len(data), chunk_rows):
+        records = (
+            data.iloc[start : start + chunk_rows]
+            .reset_index()
+            .to_json(orient="records", date_format="iso")
+        )
+        yield ("," if start else "") + records[1:-1]
+    yield "]}"
+
+
+def serialize_columnar(data):
+    """
+    Serializes a data frame into a compact columnar JSON, where the values of
+    each column are a single list. -> {"columns": [...], "data": [[...], ...]}
+
+    @data: is a data frame
+    @return: a generator of strings
+    """
+    yield '{"columns":' + json.dumps([str(column) for column in data.columns])
+    yield ',"data":['
+    for index, column in enumerate(data.columns):
+        values = data[column].to_json(orient="values", date_format="iso")
+        yield ("," if index else "") + values
+    yield "]}"
+
+
+def serialize_csv(data, chunk_rows=SERIALIZE_CHUNK_ROWS):
+    """
+    Serializes a data frame into CSV (with a header) in chunks of rows.
+
+    @data: is a data frame
+    @chunk_rows: is the number of rows in each chunk
+    @return: a generator of strings
+    """
+    for start in range(0, max(len(data), 1), chunk_rows):
+        buffer = io.StringIO()
+        data.iloc[start : start + chunk_rows].to_csv(
+            buffer, header=start == 0, index=False
+        )
+        yield buffer.getvalue()
+
+
+def serialize_data_frame(data, content_type=FORMAT_JSON):
+    """
+    Serializes a data frame into the given format.
+
+    @data: is a data frame
+    @content_type: is the content type of the format (see FORMATS)
+    @return: a generator of strings
+    """
+    if content_type == FORMAT_CSV:
+        return serialize_csv(data)
+    if content_type == FORMAT_COLUMNAR:
+        return serialize_columnar(data)
+
+    return serialize_table(data)
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses a stream of chunks into a gzip stream. Every chunk is flushed,
+    so the client can decompress the data as soon as it is received.
+
+    @chunks: is an iterable of bytes
+    @return: a generator of bytes
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 -> gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
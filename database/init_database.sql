@@ -17,9 +17,9 @@ CREATE TABLE IF NOT EXISTS "ad_network" (
   ad_network_updated_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
--- Create a daily report table if it doesn't exist
+-- Create a daily report table if it doesn't exist (partitioned by month)
 CREATE TABLE IF NOT EXISTS "daily_report" (
-  report_id SERIAL NOT NULL PRIMARY KEY,
+  report_id SERIAL NOT NULL,
   report_date DATE NOT NULL,
   report_app VARCHAR(255) NOT NULL,
   report_platform VARCHAR(63) NOT NULL,
@@ -33,5 +33,39 @@ CREATE TABLE IF NOT EXISTS "daily_report" (
     NULL,
     ad_network_id INT REFERENCES ad_network(ad_network_id) ON DELETE
   SET
-    NULL
-);
\ No newline at end of file
+    NULL,
+    -- The partition key must be a part of the primary key
+    PRIMARY KEY (report_id, report_date),
+    -- Natural key of a report row, reimports update the existing rows (rows
+    -- without an Ad Network conflict too, PostgreSQL 15+)
+    CONSTRAINT daily_report_unique UNIQUE NULLS NOT DISTINCT (
+      report_date,
+      report_app,
+      report_platform,
+      ad_network_id
+    )
+) PARTITION BY RANGE (report_date);
+
+-- Monthly partitions (daily_report_YYYY_MM) are created by the application
+-- before a report is saved
+
+-- Create indexes for the queries by Ad Network and by app and platform
+CREATE INDEX IF NOT EXISTS daily_report_ad_network_date_idx ON "daily_report" (ad_network_id, report_date);
+
+CREATE INDEX IF NOT EXISTS daily_report_app_platform_idx ON "daily_report" (report_app, report_platform);
+
+-- Create an app table if it doesn't exist
+CREATE TABLE IF NOT EXISTS "app" (
+  app_id SERIAL NOT NULL PRIMARY KEY,
+  app_name VARCHAR(255) NOT NULL UNIQUE,
+  app_created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  app_updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Create a platform table if it doesn't exist
+CREATE TABLE IF NOT EXISTS "platform" (
+  platform_id SERIAL NOT NULL PRIMARY KEY,
+  platform_name VARCHAR(63) NOT NULL UNIQUE,
+  platform_created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  platform_updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
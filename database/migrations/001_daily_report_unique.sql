@@ -0,0 +1,74 @@
+-- Removes duplicated daily reports and adds the natural key of the
+-- daily_report table to an existing database. New databases already get the
+-- constraint from init_database.sql. Rows without an Ad Network are a part of
+-- the key too (NULLS NOT DISTINCT, PostgreSQL 15+), a constraint which was
+-- added without it is replaced. The migration can be run more than once.
+BEGIN;
+
+-- Keep only the most recently imported row of every natural key (the window
+-- partitions group the rows without an Ad Network together)
+DELETE FROM
+  "daily_report"
+WHERE
+  report_id IN (
+    SELECT
+      report_id
+    FROM
+      (
+        SELECT
+          report_id,
+          ROW_NUMBER() OVER (
+            PARTITION BY report_date,
+            report_app,
+            report_platform,
+            ad_network_id
+            ORDER BY
+              report_id DESC
+          ) AS report_row
+        FROM
+          "daily_report"
+      ) AS ranked_report
+    WHERE
+      report_row > 1
+  );
+
+-- Drop the unique constraint if its rows without an Ad Network never conflict
+DO $$ BEGIN IF EXISTS (
+  SELECT
+    1
+  FROM
+    pg_constraint
+    JOIN pg_index ON pg_index.indexrelid = pg_constraint.conindid
+  WHERE
+    pg_constraint.conrelid = '"daily_report"'::regclass
+    AND pg_constraint.conname = 'daily_report_unique'
+    AND NOT pg_index.indnullsnotdistinct
+) THEN
+ALTER TABLE
+  "daily_report" DROP CONSTRAINT daily_report_unique;
+END IF;
+END $$;
+
+-- Add the unique constraint if it doesn't exist
+DO $$ BEGIN IF NOT EXISTS (
+  SELECT
+    1
+  FROM
+    pg_constraint
+  WHERE
+    conrelid = '"daily_report"'::regclass
+    AND conname = 'daily_report_unique'
+) THEN
+ALTER TABLE
+  "daily_report"
+ADD
+  CONSTRAINT daily_report_unique UNIQUE NULLS NOT DISTINCT (
+    report_date,
+    report_app,
+    report_platform,
+    ad_network_id
+  );
+END IF;
+END $$;
+
+COMMIT;
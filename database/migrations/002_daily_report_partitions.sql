@@ -0,0 +1,86 @@
+-- Converts an existing daily_report table into a table partitioned by month
+-- with the indexes of init_database.sql. Run it after
+-- 001_daily_report_unique.sql, because duplicated rows can't be moved into the
+-- new table.
+BEGIN;
+
+-- Keep the old table and free the names of its constraints and sequence
+ALTER TABLE
+  "daily_report" RENAME TO "daily_report_unpartitioned";
+
+ALTER TABLE
+  "daily_report_unpartitioned" RENAME CONSTRAINT daily_report_pkey TO daily_report_unpartitioned_pkey;
+
+ALTER TABLE
+  "daily_report_unpartitioned" RENAME CONSTRAINT daily_report_unique TO daily_report_unpartitioned_unique;
+
+ALTER SEQUENCE daily_report_report_id_seq RENAME TO daily_report_unpartitioned_report_id_seq;
+
+-- Create the partitioned table
+CREATE TABLE "daily_report" (
+  report_id SERIAL NOT NULL,
+  report_date DATE NOT NULL,
+  report_app VARCHAR(255) NOT NULL,
+  report_platform VARCHAR(63) NOT NULL,
+  report_requests INT NOT NULL,
+  report_impressions INT NOT NULL,
+  report_revenue DECIMAL(10, 2) NOT NULL,
+  report_created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  report_updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  currency_usd_id INT REFERENCES currency_usd(currency_usd_id) ON DELETE
+  SET
+    NULL,
+    ad_network_id INT REFERENCES ad_network(ad_network_id) ON DELETE
+  SET
+    NULL,
+    PRIMARY KEY (report_id, report_date),
+    CONSTRAINT daily_report_unique UNIQUE NULLS NOT DISTINCT (
+      report_date,
+      report_app,
+      report_platform,
+      ad_network_id
+    )
+) PARTITION BY RANGE (report_date);
+
+CREATE INDEX daily_report_ad_network_date_idx ON "daily_report" (ad_network_id, report_date);
+
+CREATE INDEX daily_report_app_platform_idx ON "daily_report" (report_app, report_platform);
+
+-- Create a partition for every month of the existing reports
+DO $$
+DECLARE
+  report_month DATE;
+BEGIN
+  FOR report_month IN
+    SELECT DISTINCT date_trunc('month', report_date)::DATE
+    FROM "daily_report_unpartitioned"
+  LOOP
+    EXECUTE format(
+      'CREATE TABLE %I PARTITION OF "daily_report" FOR VALUES FROM (%L) TO (%L)',
+      'daily_report_' || to_char(report_month, 'YYYY_MM'),
+      report_month,
+      (report_month + INTERVAL '1 month')::DATE
+    );
+  END LOOP;
+END $$;
+
+-- Move the reports and continue the identifiers of the old table
+INSERT INTO
+  "daily_report"
+SELECT
+  *
+FROM
+  "daily_report_unpartitioned";
+
+SELECT
+  setval(
+    'daily_report_report_id_seq',
+    COALESCE(MAX(report_id), 0) + 1,
+    false
+  )
+FROM
+  "daily_report";
+
+DROP TABLE "daily_report_unpartitioned";
+
+COMMIT;
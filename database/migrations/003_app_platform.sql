@@ -0,0 +1,38 @@
+-- Adds the app and platform tables of init_database.sql to an existing
+-- database and seeds them with the default apps and platforms of the
+-- application. The migration can be run more than once.
+BEGIN;
+
+-- Create an app table if it doesn't exist
+CREATE TABLE IF NOT EXISTS "app" (
+  app_id SERIAL NOT NULL PRIMARY KEY,
+  app_name VARCHAR(255) NOT NULL UNIQUE,
+  app_created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  app_updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Create a platform table if it doesn't exist
+CREATE TABLE IF NOT EXISTS "platform" (
+  platform_id SERIAL NOT NULL PRIMARY KEY,
+  platform_name VARCHAR(63) NOT NULL UNIQUE,
+  platform_created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  platform_updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Seed the default apps (utils/app_const.py) and platforms
+-- (utils/platform_const.py)
+INSERT INTO
+  "app" (app_name)
+VALUES
+  ('My Talking Angela'),
+  ('My Talking Ben'),
+  ('My Talking Tom'),
+  ('Talking Ginger') ON CONFLICT (app_name) DO NOTHING;
+
+INSERT INTO
+  "platform" (platform_name)
+VALUES
+  ('Android'),
+  ('iOS') ON CONFLICT (platform_name) DO NOTHING;
+
+COMMIT;